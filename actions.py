@@ -1,26 +1,57 @@
-import logging
+from utils import Decision
+from events import (
+    ActionDeclared,
+    ActionExecuted,
+    ActionFailed,
+    Blocked,
+    BlockChallenged,
+    BlockChallengeResolved,
+    CardReplaced,
+    Challenged,
+    ChallengeResolved,
+    Exchanged,
+)
 
 # define base classes
 class BaseAction:
+    # attributes of all subclasses live here, multiple bases with slots can't be combined
+    __slots__ = (
+        "executing_player",
+        "deck",
+        "rules",
+        "handled",
+        "target_player",
+        "challenging_player",
+        "blocking_player",
+        "block_challenging_player",
+    )
     cost = 0
 
-    def __init__(self, executing_player, deck, *args, **kwargs):
+    def __init__(self, executing_player, deck, rules, *args, **kwargs):
         self.executing_player = executing_player
         self.deck = deck
+        self.rules = rules  # the game's rules.Rules
         self.executing_player.subtract_coins(self.cost)
         self.handled = False
-        logging.info(f"{self.executing_player} wants to execute {self}.")
+        self.events.emit(ActionDeclared, self.executing_player, self)
 
     def __str__(self):
         return self.__class__.__name__
 
+    @property
+    def events(self):
+        return self.executing_player.events
+
     def execute(self):
         assert not self.handled, f"{self} was already handled."
-        logging.info(f"{self.executing_player} executed {self}.")
+        self.events.emit(ActionExecuted, self.executing_player, self)
         self.handled = True
+        yield from ()  # like all rule steps a generator, even without decisions
 
 
 class InterAction(BaseAction):
+    __slots__ = ()
+
     def __init__(self, *args, target_player, **kwargs):
         self.target_player = target_player
         super().__init__(*args, **kwargs)
@@ -30,126 +61,136 @@ class InterAction(BaseAction):
 
 
 class CharacterAction(BaseAction):
+    __slots__ = ()
+
     def challenge(self, challenging_player):
         self.challenging_player = challenging_player
-        logging.info(
-            f"{self.challenging_player} challenges {self.executing_player}'s {self}."
+        self.events.emit(
+            Challenged, self.challenging_player, self.executing_player, self
         )
-        character = self.executing_player.challenge(self)
+        character = yield from self.executing_player.challenge(self)
         if character is not None:
-            logging.info(f"{self.executing_player}'s {self} was not a bluff.")
-            character.reveal()
+            self.events.emit(ChallengeResolved, self.executing_player, self, False)
+            self.executing_player.reveal(character)
             self.executing_player.remove_card(character)
-            self.deck.put_back(type(character)())
+            self.deck.put_back(self.deck.new_card(type(character)))
             self.executing_player.add_card(self.deck.draw())
-            logging.info(f"{self.executing_player} replaces {character}.")
-            self.challenging_player.lose_influence()
+            self.events.emit(CardReplaced, self.executing_player, character)
+            yield from self.challenging_player.lose_influence()
             return False
         else:
-            logging.info(f"{self.executing_player}'s {self} was a bluff.")
-            self.executing_player.lose_influence()
+            self.events.emit(ChallengeResolved, self.executing_player, self, True)
+            yield from self.executing_player.lose_influence()
             return True
 
 
 class BlockableAction(BaseAction):
+    __slots__ = ()
+
     def block(self, blocking_player):
         self.blocking_player = blocking_player
-        logging.info(
-            f"{self.blocking_player} blocks {self.executing_player}'s attempt at {self}."
-        )
+        self.events.emit(Blocked, self.blocking_player, self.executing_player, self)
 
     def challenge_block(self, block_challenging_player):
         self.block_challenging_player = block_challenging_player
-        logging.info(
-            f"{self.block_challenging_player} challenges {self.blocking_player}'s block."
+        self.events.emit(
+            BlockChallenged, self.block_challenging_player, self.blocking_player, self
         )
-        character = self.blocking_player.challenge(self, block=True)
+        character = yield from self.blocking_player.challenge(self, block=True)
         if character is not None:
-            logging.info(f"{self.blocking_player}'s block was not a bluff.")
-            character.reveal()
+            self.events.emit(BlockChallengeResolved, self.blocking_player, self, False)
+            self.blocking_player.reveal(character)
             self.blocking_player.remove_card(character)
-            self.deck.put_back(type(character)())
+            self.deck.put_back(self.deck.new_card(type(character)))
             self.blocking_player.add_card(self.deck.draw())
-            logging.info(f"{self.blocking_player} replaces {character}.")
-            self.block_challenging_player.lose_influence()
+            self.events.emit(CardReplaced, self.blocking_player, character)
+            yield from self.block_challenging_player.lose_influence()
             return False
         else:
-            logging.info(f"{self.blocking_player}'s block was a bluff.")
-            self.blocking_player.lose_influence()
+            self.events.emit(BlockChallengeResolved, self.blocking_player, self, True)
+            yield from self.blocking_player.lose_influence()
             return True
 
 
 # From this line onwards the actually usable actions are defined
 class Income(BaseAction):
+    __slots__ = ()
+
     def execute(self):
-        super().execute()
+        yield from super().execute()
         self.executing_player.add_coins(1)
 
 
 class ForeignAid(BlockableAction):
+    __slots__ = ()
+
     def execute(self):
-        super().execute()
+        yield from super().execute()
         self.executing_player.add_coins(2)
 
 
 class Tax(CharacterAction):
+    __slots__ = ()
+
     def execute(self):
-        super().execute()
+        yield from super().execute()
         self.executing_player.add_coins(3)
 
 
 class Coup(InterAction):
+    __slots__ = ()
     cost = 7
 
     def execute(self):
-        super().execute()
-        self.target_player.lose_influence()
+        yield from super().execute()
+        yield from self.target_player.lose_influence()
 
 
 class Assassinate(InterAction, BlockableAction, CharacterAction):
+    __slots__ = ()
     cost = 3
 
     def execute(self):
-        super().execute()
-        try:
-            self.target_player.lose_influence()
-        except AssertionError:  # If the action was unsuccessfully challenged, the target_player might have no influences left at the time of execution.
-            logging.warning(
-                f"{self.executing_player}'s {self} could not be executed, since {self.target_player} is already out of the game."
+        yield from super().execute()
+        # after an unsuccessful challenge the target might have no influences left
+        if self.target_player.is_alive():
+            yield from self.target_player.lose_influence()
+        else:
+            self.events.emit(
+                ActionFailed, self.executing_player, self, self.target_player
             )
 
 
 class Steal(InterAction, BlockableAction, CharacterAction):
+    __slots__ = ()
+
     def execute(self):
-        super().execute()
-        stolen_coins = 2
-        while True:
-            try:
-                self.target_player.subtract_coins(stolen_coins)
-            except ValueError:  # player does not have enough coins
-                stolen_coins -= 1
-                continue  # try again
-            break  # stealing was sucessfull
+        yield from super().execute()
+        stolen_coins = min(2, self.target_player.coins)  # as much as the target has
+        self.target_player.subtract_coins(stolen_coins)
         self.executing_player.add_coins(stolen_coins)
 
 
 class Exchange(CharacterAction):
+    __slots__ = ()
+
     def execute(self):
-        super().execute()
+        yield from super().execute()
         original = self.executing_player.get_unrevealed_influences()
         drawn = self.deck.draw(2)
         options = original + drawn
-        choices = self.executing_player.controller.choose_exchange(
-            options, len(original)
+        choices = yield Decision(
+            self.executing_player, "choose_exchange", (options, len(original))
         )
-        drops = set(original) - set(choices)
-        gains = set(choices) - set(original)
+        self.events.emit(Exchanged, self.executing_player, options, choices)
+        drops = [c for c in original if c not in choices]
+        gains = [c for c in drawn if c in choices]
         assert len(drops) == len(gains), f"Can't trade {len(drops)} for {len(gains)}."
         for drop in drops:
-            self.executing_player.influences.remove(drop)
+            self.executing_player.remove_card(drop)
         for gain in gains:
-            self.executing_player.influences.append(gain)
-        unused = set(options) - set(choices)
+            self.executing_player.add_card(gain)
+        unused = [c for c in options if c not in choices]
         assert len(unused) == len(drawn)
         for card in unused:
             self.deck.put_back(card)
@@ -0,0 +1,173 @@
+from entities import AIController_Random
+from events import (
+    ActionDeclared,
+    Blocked,
+    BlockChallengeResolved,
+    CardReplaced,
+    CardRevealed,
+    ChallengeResolved,
+    Exchanged,
+)
+from collections import Counter
+from math import comb
+
+
+class CardCounter:
+    """
+    Beliefs of one player about the hidden cards of a game, maintained from the game's events.
+    Unknown cards are the opponents' unrevealed influences and the deck. Their composition is
+    the game's cards minus the revealed ones and the observer's own hidden cards.
+    On top, per opponent the characters they claimed since their hand last changed,
+    and the characters they were caught bluffing (so they hold none of them).
+    All queries are O(1) in the length of the game.
+    """
+
+    def __init__(self, game, observer, claim_weight=3.0):
+        self.game = game
+        self.observer = observer
+        self.claim_weight = claim_weight  # likelihood ratio of claims by holders
+        self.total = Counter(type(c) for c in game.deck.cards)
+        for player in game.players:
+            self.total.update(type(c) for c in player.influences)
+        # public state so far, the counter can join a game in progress
+        self.revealed = Counter(
+            type(c) for p in game.players for c in p.influences if c.revealed
+        )
+        self.own = Counter()
+        self.own_dirty = True  # own hand changed, recounted on the next query
+        self.claims = {p: set() for p in game.players}
+        self.excluded = {p: set() for p in game.players}
+        self.handlers = {
+            ActionDeclared: self.on_declared,
+            Blocked: self.on_blocked,
+            ChallengeResolved: self.on_challenge_resolved,
+            BlockChallengeResolved: self.on_block_challenge_resolved,
+            CardRevealed: self.on_revealed,
+            CardReplaced: self.on_replaced,
+            Exchanged: self.on_exchanged,
+        }
+        game.events.subscribe(self)
+
+    def __call__(self, event):
+        handler = self.handlers.get(type(event))
+        if handler is not None:
+            handler(event)
+
+    # event handlers
+    def on_declared(self, event):
+        action = event.action
+        if action.rules.challengeable[type(action)]:
+            self.claims[event.player].update(action.rules.claimants[type(action)])
+
+    def on_blocked(self, event):
+        action = event.action
+        self.claims[event.blocker].update(action.rules.blockers[type(action)])
+
+    def on_challenge_resolved(self, event):
+        if event.bluff:  # none of the unrevealed cards could perform the action
+            action = event.action
+            self.excluded[event.player].update(action.rules.claimants[type(action)])
+
+    def on_block_challenge_resolved(self, event):
+        if event.bluff:
+            action = event.action
+            self.excluded[event.blocker].update(action.rules.blockers[type(action)])
+
+    def on_revealed(self, event):
+        self.revealed[type(event.character)] += 1
+        if event.player is self.observer:
+            self.own_dirty = True
+
+    def on_replaced(self, event):
+        # the proven card went back into the deck, a new unknown card was drawn
+        self.revealed[type(event.character)] -= 1
+        self.hand_changed(event.player)
+
+    def on_exchanged(self, event):
+        self.hand_changed(event.player)
+
+    def hand_changed(self, player):
+        self.claims[player] = set()
+        self.excluded[player] = set()
+        if player is self.observer:
+            self.own_dirty = True
+
+    # queries
+    def own_hand(self):
+        if self.own_dirty:
+            influences = self.observer.get_unrevealed_influences()
+            self.own = Counter(type(c) for c in influences)
+            self.own_dirty = False
+        return self.own
+
+    def unseen(self, character):
+        """Number of copies of the character among the unknown cards."""
+        own = self.own_hand()
+        return self.total[character] - self.revealed[character] - own[character]
+
+    def n_unknown(self):
+        return sum(self.unseen(c) for c in self.total)  # at most one term per character
+
+    def deck_probability(self, character):
+        """Probability that a card drawn from the deck is of the character."""
+        n_unknown = self.n_unknown()
+        return self.unseen(character) / n_unknown if n_unknown else 0.0
+
+    def probability(self, player, characters):
+        """Probability that the player holds at least one card of the given characters."""
+        if player is self.observer:
+            return float(any(self.own_hand()[c] for c in characters))
+        characters = set(characters) - self.excluded[player]
+        if not characters:
+            return 0.0
+        k = player.n_unrevealed
+        # the player's cards are drawn from the unknown cards they can have
+        pool = self.n_unknown() - sum(self.unseen(c) for c in self.excluded[player])
+        misses = pool - sum(self.unseen(c) for c in characters)
+        if k == 0 or pool < k:
+            return 0.0
+        p = 1 - comb(max(misses, 0), k) / comb(pool, k)
+        if characters & self.claims[player] and 0 < p < 1:
+            odds = p / (1 - p) * self.claim_weight
+            p = odds / (1 + odds)
+        return p
+
+    def bluff_probability(self, action, block=False):
+        """Probability that the executing (or blocking) player can't prove the action (or block)."""
+        rules = action.rules
+        if block:
+            return 1 - self.probability(
+                action.blocking_player, rules.blockers[type(action)]
+            )
+        return 1 - self.probability(
+            action.executing_player, rules.claimants[type(action)]
+        )
+
+
+class AIController_CardCounter(AIController_Random):
+    """
+    Challenges claims that are likely bluffs according to its CardCounter, and blocks only with a fitting card.
+    The counter subscribes to the game's events on the first decision, the EventBus is then no longer silent.
+    """
+
+    __slots__ = ("counter", "threshold")
+
+    def __init__(self, threshold=0.5, rng=None):
+        super().__init__(rng=rng)
+        self.counter = None
+        self.threshold = threshold
+
+    def beliefs(self):
+        if self.counter is None or self.counter.game is not self.game:
+            self.counter = CardCounter(self.game, self.player)
+        return self.counter
+
+    def decide_challenge(self, action):
+        return self.beliefs().bluff_probability(action) > self.threshold
+
+    def decide_block(self, action):
+        blockers = action.rules.blockers[type(action)]
+        return self.beliefs().probability(self.player, blockers) == 1.0
+
+    def decide_challenge_block(self, action):
+        return self.beliefs().bluff_probability(action, block=True) > self.threshold
@@ -0,0 +1,302 @@
+"""
+Benchmarks of the engine's hot paths.
+
+Run `python benchmarks.py --output results.json` to store the results as JSON and
+`python benchmarks.py --baseline results.json` to compare a later run against them.
+All metrics are rates (higher is better) except the ones ending in _bytes.
+"""
+from entities import Player, Deck, AIController_Random, get_random_AI
+from entities import AIController_Defensive, AIController_Skeptic
+from characters import Ambassador, Duke
+from actions import Tax, ForeignAid, Steal, Assassinate
+from game import Game
+from utils import RandomNameGenerator, run_steps
+import argparse
+import copy
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+LINEUPS = {
+    "random": [AIController_Random] * 4,
+    "mixed": [get_random_AI] * 4,
+    "defensive_vs_skeptic": [AIController_Defensive, AIController_Skeptic] * 2,
+}
+
+
+def new_game(rng, n_players=4, multiplicity=3, controllers=None):
+    deck = Deck(anonymous=True, rng=rng, multiplicity=multiplicity)
+    controllers = controllers or [AIController_Random] * n_players
+    players = [Player(c(rng=rng)) for c in controllers]
+    return Game(players, deck, rng=rng)
+
+
+def memory_per_game(n_games=1000, seed=0):
+    """
+    Measures memory with tracemalloc and returns a dict with
+    live_bytes: bytes held per game that is set up and kept in memory,
+    played_bytes: bytes held per game after it has been played to the end (including its history).
+    """
+    rng = random.Random(seed)
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        games = [new_game(rng) for i in range(n_games)]
+        live = tracemalloc.get_traced_memory()[0] - baseline
+        for game in games:
+            game.run()
+        played = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return {"live_bytes": live / n_games, "played_bytes": played / n_games}
+
+
+def rate(function, n):
+    start = time.perf_counter()
+    for i in range(n):
+        function()
+    return n / (time.perf_counter() - start)
+
+
+def setup_rate(setup, function, n):
+    """Rate of function(setup()), only timing the function."""
+    elapsed = 0.0
+    for i in range(n):
+        argument = setup()
+        start = time.perf_counter()
+        function(argument)
+        elapsed += time.perf_counter() - start
+    return n / elapsed
+
+
+def game_rates(n_games=1000, seed=0, **game_kwargs):
+    """Returns games and turns played per second, setup included."""
+    rng = random.Random(seed)
+    n_turns = 0
+    start = time.perf_counter()
+    for i in range(n_games):
+        game = new_game(rng, **game_kwargs)
+        game.run()
+        n_turns += len(game.actions)
+    elapsed = time.perf_counter() - start
+    return {"games": n_games / elapsed, "turns": n_turns / elapsed}
+
+
+def lineup_rates(n_games=1000, seed=0):
+    rates = {}
+    for name, controllers in LINEUPS.items():
+        for key, value in game_rates(n_games, seed, controllers=controllers).items():
+            rates[f"{name}_{key}"] = value
+    return rates
+
+
+def scaling_rates(n_games=200, seed=0, players=(2, 4, 8, 16), multiplicities=(3, 6)):
+    """Turns per second by player count and deck multiplicity, skipping decks too small to deal."""
+    rates = {}
+    for n_players in players:
+        for multiplicity in multiplicities:
+            if 5 * multiplicity < 2 * n_players + 2:
+                continue
+            turns = game_rates(
+                n_games, seed, n_players=n_players, multiplicity=multiplicity
+            )["turns"]
+            rates[f"players_{n_players}_multiplicity_{multiplicity}_turns"] = turns
+    return rates
+
+
+def deck_rates(n=100000, seed=0):
+    deck = Deck(anonymous=True, rng=random.Random(seed))
+    return {
+        "draw_put_back": rate(lambda: deck.put_back(deck.draw()), n),
+        "new_deck": rate(lambda: Deck(anonymous=True), n // 10),
+    }
+
+
+def character_rates(n=10000):
+    """Construction of anonymous and named cards, the name generator is reset afterwards."""
+    swaps, n_drawn = dict(RandomNameGenerator.swaps), RandomNameGenerator.n_drawn
+    try:
+        named = rate(Duke, n)
+    finally:
+        RandomNameGenerator.swaps = swaps
+        RandomNameGenerator.n_drawn = n_drawn
+    return {"anonymous_card": rate(lambda: Duke(anonymous=True), n), "named_card": named}
+
+
+def resolution_rates(n=20000, seed=0):
+    """
+    Rates of resolving challenges of actions and of blocks, proven and bluffed.
+    Every resolution runs on a fresh clone of a game in which seat 0 holds two Dukes and seat 1 two Ambassadors.
+    """
+    rng = random.Random(seed)
+    game = new_game(rng)
+    for player, character in zip(game.players, [Duke, Ambassador]):
+        player.influences = []
+        player.n_unrevealed = 0
+        for i in range(2):
+            player.add_card(character(anonymous=True))
+    game.index_players()
+
+    def setup(action_type, executing, other):
+        def clone_and_declare():
+            clone = game.clone(rng)
+            for player in clone.players:
+                player.connect_controller(AIController_Random(rng=rng))
+            player = clone.players[executing]
+            action = action_type(player, clone.deck, clone.rules)
+            return action, clone.players[other]
+
+        return clone_and_declare
+
+    def challenge(args):
+        action, challenger = args
+        run_steps(action.challenge(challenger))
+
+    def challenge_block(args):
+        action, blocker = args
+        action.block(blocker)
+        run_steps(action.challenge_block(action.executing_player))
+
+    return {
+        "challenge_proven": setup_rate(setup(Tax, 0, 1), challenge, n),
+        "challenge_bluff": setup_rate(setup(Tax, 1, 0), challenge, n),
+        "block_proven": setup_rate(setup(ForeignAid, 1, 0), challenge_block, n),
+        "block_bluff": setup_rate(setup(ForeignAid, 0, 1), challenge_block, n),
+    }
+
+
+def execution_rates(n=20000, seed=0):
+    """
+    Rates of executing the actions whose outcome depends on the target's state:
+    stealing from targets with 0, 1 and 2 coins and assassinating a target that is already out.
+    """
+    rng = random.Random(seed)
+    game = new_game(rng)
+
+    def setup(action_type, coins=2, alive=True):
+        def clone_and_declare():
+            clone = game.clone(rng)
+            target = clone.players[1]
+            target.coins = coins
+            if not alive:
+                for character in target.get_unrevealed_influences():
+                    target.reveal(character)
+            clone.players[0].coins = action_type.cost
+            return action_type(
+                clone.players[0], clone.deck, clone.rules, target_player=target
+            )
+
+        return clone_and_declare
+
+    def execute(action):
+        run_steps(action.execute())
+
+    return {
+        "steal_2": setup_rate(setup(Steal, coins=2), execute, n),
+        "steal_1": setup_rate(setup(Steal, coins=1), execute, n),
+        "steal_0": setup_rate(setup(Steal, coins=0), execute, n),
+        "assassinate_out": setup_rate(setup(Assassinate, alive=False), execute, n),
+    }
+
+
+def cloning_rates(n=20000, seed=0):
+    """
+    Returns operations per second for copying the state of a game halfway through,
+    comparing Game.clone and Game.snapshot/restore to copy.deepcopy.
+    """
+    rng = random.Random(seed)
+    game = new_game(rng)
+    for i in range(2):
+        game.run_round()
+    state = game.snapshot()
+    return {
+        "clone": rate(game.clone, n),
+        "snapshot": rate(game.snapshot, n),
+        "restore": rate(lambda: game.restore(state), n),
+        "deepcopy": rate(lambda: copy.deepcopy(game), n // 20),
+    }
+
+
+def game_setup_rates(n=10000, seed=0):
+    rng = random.Random(seed)
+    return {"game_setup": rate(lambda: new_game(rng), n)}
+
+
+SUITE = {
+    "lineups": lineup_rates,
+    "scaling": scaling_rates,
+    "deck": deck_rates,
+    "characters": character_rates,
+    "resolution": resolution_rates,
+    "execution": execution_rates,
+    "setup": game_setup_rates,
+    "cloning": cloning_rates,
+    "memory": memory_per_game,
+}
+
+
+def run_suite(names=None):
+    """Runs the named benchmarks (all by default) and returns their metrics as a flat dict."""
+    metrics = {}
+    for name in names or SUITE:
+        for key, value in SUITE[name]().items():
+            metrics[f"{name}.{key}"] = value
+    return metrics
+
+
+def compare(metrics, baseline, tolerance=0.1):
+    """
+    Returns (metric, baseline value, value, relative change) of all metrics that are worse
+    than in the baseline by more than tolerance. Metrics missing on either side or zero in the baseline are skipped.
+    """
+    regressions = []
+    for key, value in metrics.items():
+        if key not in baseline:
+            continue
+        old = baseline[key]
+        if old == 0:
+            continue  # no relative change to a zero baseline
+        change = (value - old) / old
+        if key.endswith("_bytes"):
+            change = -change  # less is better
+        if change < -tolerance:
+            regressions.append((key, old, value, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "benchmarks", nargs="*", help=f"any of {', '.join(SUITE)} (default: all)"
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against the JSON of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in SUITE]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    metrics = run_suite(args.benchmarks)
+    for key, value in metrics.items():
+        print(f"{key}: {value:.0f}")
+    if args.output:
+        report = {"python": platform.python_version(), "metrics": metrics}
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(metrics, baseline, args.tolerance)
+        for key, old, new, change in regressions:
+            print(f"REGRESSION {key}: {old:.0f} -> {new:.0f} ({change:+.0%})")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
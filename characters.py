@@ -1,18 +1,19 @@
 from actions import Income, ForeignAid, Tax, Coup, Assassinate, Steal, Exchange
 from utils import RandomNameGenerator
-import logging
 
 
 class BaseCharacter:
-    def __init__(self, name=None):
-        self.name = RandomNameGenerator().get_random_name() if name is None else name
+    __slots__ = ("name", "revealed")
+    # capabilities are shared, immutable class data
+    actions = frozenset({Income, ForeignAid, Coup})
+    blocks = frozenset()
+
+    def __init__(self, name=None, anonymous=False):
+        if anonymous:
+            self.name = None  # headless games never look at names
+        else:
+            self.name = RandomNameGenerator().get_random_name() if name is None else name
         self.revealed = False
-        self.actions = {
-            Income,
-            ForeignAid,
-            Coup,
-        }
-        self.blocks = set()
 
     def __repr__(self):
         return f"{self.__class__.__name__}(name='{self.name}')"
@@ -24,41 +25,49 @@ class BaseCharacter:
         else:
             return f"{title} {self.name}"
 
+    @classmethod
+    def blank(cls, revealed=False):
+        """Card without a name, created without drawing one (e.g. when restoring a GameState)."""
+        card = object.__new__(cls)
+        card.name = None
+        card.revealed = revealed
+        return card
+
+    def copy(self):
+        card = object.__new__(type(self))  # skips drawing a name
+        card.name = self.name
+        card.revealed = self.revealed
+        return card
+
     def reveal(self):
         assert self.revealed == False, f"{self} is already revealed."
         self.revealed = True
-        logging.info(f"{self} was revealed.")
         return type(self)
 
 
 class Ambassador(BaseCharacter):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.actions.add(Exchange)
-        self.blocks.add(Steal)
+    __slots__ = ()
+    actions = BaseCharacter.actions | {Exchange}
+    blocks = frozenset({Steal})
 
 
 class Assassin(BaseCharacter):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.actions.add(Assassinate)
+    __slots__ = ()
+    actions = BaseCharacter.actions | {Assassinate}
 
 
 class Captain(BaseCharacter):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.actions.add(Steal)
-        self.blocks.add(Steal)
+    __slots__ = ()
+    actions = BaseCharacter.actions | {Steal}
+    blocks = frozenset({Steal})
 
 
 class Contessa(BaseCharacter):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.blocks.add(Assassinate)
+    __slots__ = ()
+    blocks = frozenset({Assassinate})
 
 
 class Duke(BaseCharacter):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.actions.add(Tax)
-        self.blocks.add(ForeignAid)
+    __slots__ = ()
+    actions = BaseCharacter.actions | {Tax}
+    blocks = frozenset({ForeignAid})
@@ -0,0 +1,121 @@
+"""
+Checkpointed tournaments, which can be resumed after the process died.
+
+Every game of a seeded tournament draws from its own stream (see simulation.game_rng), so the
+position in all random streams is the number of completed games. A checkpoint therefore only
+holds the configuration, the seed, the completed game count and the aggregated WinRateStats.
+Results are aggregated in game order, so a resumed tournament ends with exactly the statistics
+of an uninterrupted one.
+"""
+from stats import WinRateStats
+from sweep import describe
+from tournament import iter_results
+from utils import write_atomic
+import pickle
+import random
+import signal
+import sys
+
+VERSION = 2  # 2: WinRateStats per controller class and seat
+
+
+def save_checkpoint(path, data):
+    """Writes the pickled state atomically and durably: a crash leaves either the old or the new checkpoint."""
+    write_atomic(path, data)
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def run_resumable(
+    n_games,
+    player_factories,
+    path,
+    seed=None,
+    checkpoint_every=5000,
+    workers=None,
+    chunk_size=500,
+    deck_kwargs=None,
+    on_checkpoint=None,
+    **game_kwargs,
+):
+    """
+    Plays a tournament (see tournament.iter_results) and returns its WinRateStats, writing a checkpoint to path
+    every checkpoint_every games and whenever the run stops, e.g. on KeyboardInterrupt.
+    If path holds a checkpoint of the same configuration, the tournament resumes after its last completed game.
+    Without a seed a random one is drawn and stored in the checkpoint.
+    on_checkpoint(state) is called after each checkpoint, e.g. for progress reports.
+    """
+    config = {
+        "lineup": describe(list(player_factories)),
+        "n_games": n_games,
+        "deck_kwargs": describe(deck_kwargs or {}),
+        "game_kwargs": describe(game_kwargs),
+    }
+    state = load_checkpoint(path)
+    if state is None:
+        seed = random.getrandbits(64) if seed is None else seed
+        state = {
+            "version": VERSION,
+            "config": config,
+            "seed": seed,
+            "completed": 0,
+            "stats": WinRateStats(),
+        }
+    elif state["version"] != VERSION or state["config"] != config:
+        raise ValueError(f"{path} is a checkpoint of another tournament")
+    elif seed is not None and seed != state["seed"]:
+        raise ValueError(f"{path} was played with seed {state['seed']}, not {seed}")
+
+    stats = state["stats"]
+    consistent = pickle.dumps(state)  # the state at the last checkpoint
+    updating = False  # an interruption now would leave stats and completed apart
+    results = iter_results(
+        n_games,
+        player_factories,
+        state["seed"],
+        workers,
+        chunk_size,
+        deck_kwargs,
+        first_game=state["completed"],
+        **game_kwargs,
+    )
+    try:
+        for result in results:
+            updating = True
+            stats.update(result)
+            state["completed"] += 1
+            updating = False
+            if state["completed"] % checkpoint_every == 0:
+                consistent = pickle.dumps(state)
+                save_checkpoint(path, consistent)
+                if on_checkpoint is not None:
+                    on_checkpoint(state)
+    finally:
+        results.close()
+        save_checkpoint(path, consistent if updating else pickle.dumps(state))
+    return stats
+
+
+def main(path="tournament.checkpoint", n_games=200000, seed=0):
+    from entities import get_random_AI
+
+    # preemption usually announces itself with SIGTERM, exit through the final checkpoint
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    stats = run_resumable(
+        n_games,
+        [get_random_AI] * 4,
+        path,
+        seed=seed,
+        on_checkpoint=lambda state: print(f"{state['completed']} games completed"),
+    )
+    print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
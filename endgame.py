@@ -0,0 +1,225 @@
+"""
+Exact solver of two player endgames under a fixed hidden-card assumption.
+
+Both hands are assumed to be known (e.g. the opponent's most likely hand according to a CardCounter),
+and a card that proves a claim is assumed to be replaced by one of the same character.
+Exchanges can't change a hand under this assumption and are not considered.
+
+Values are from the perspective of the player to move: 1 is a forced win, -1 a forced loss,
+0 undecided within the solver's horizon of turns (e.g. both players can stall forever).
+Decided values are exact, undecided ones are cached with the depth they were searched to.
+"""
+from actions import Income, ForeignAid, Tax, Coup, Assassinate, Steal
+from beliefs import AIController_CardCounter
+from utils import write_atomic
+from collections import OrderedDict
+import pickle
+
+GAINS = {Income: 1, ForeignAid: 2, Tax: 3}
+KILLS = {Coup, Assassinate}
+MODELED = set(GAINS) | KILLS | {Steal}
+
+
+def hand(influences):
+    """Canonical hand: sorted character names of the unrevealed influences."""
+    return tuple(sorted(type(c).__name__ for c in influences if not c.revealed))
+
+
+def without(hand, character):
+    i = hand.index(character)
+    return hand[:i] + hand[i + 1 :]
+
+
+class EndgameSolver:
+    """
+    Memoized search over positions (coins and hand of the player to move, coins and hand of the opponent).
+    The transposition table is an LRU cache of at most capacity positions, it can be saved and loaded.
+    """
+
+    def __init__(self, rules, horizon=12, capacity=1000000):
+        self.rules = rules
+        self.horizon = horizon  # in turns
+        self.capacity = capacity
+        self.table = OrderedDict()  # position -> (value, depth searched)
+        self.hits = 0
+        self.misses = 0
+        names = lambda characters: frozenset(c.__name__ for c in characters)
+        # variants may leave out modeled actions, they are not in the rules' tables then
+        self.claimants = {
+            a: names(rules.claimants[a])
+            for a in MODELED
+            if rules.challengeable.get(a)
+        }
+        self.blockers = {
+            a: names(rules.blockers[a]) for a in MODELED if rules.blockable.get(a)
+        }
+
+    def signature(self):
+        characters = set()
+        for a in self.rules.action_types:
+            characters |= self.rules.claimants[a] | self.rules.blockers[a]
+        return (
+            tuple(a.__name__ for a in self.rules.action_types),
+            tuple(sorted(c.__name__ for c in characters)),
+        )
+
+    def available(self, coins):
+        return [a for a in self.rules.available(coins) if a in MODELED]
+
+    # search
+    def value(self, my_coins, my_hand, their_coins, their_hand, depth=None):
+        depth = self.horizon if depth is None else depth
+        if not my_hand:
+            return -1
+        elif not their_hand:
+            return 1
+        elif depth == 0:
+            return 0
+        position = (my_coins, my_hand, their_coins, their_hand)
+        entry = self.table.get(position)
+        if entry is not None and (entry[0] != 0 or entry[1] >= depth):
+            self.hits += 1
+            self.table.move_to_end(position)
+            return entry[0]
+        self.misses += 1
+        best = -1
+        for action in self.available(my_coins):
+            best = max(best, self.action_value(action, *position, depth))
+            if best == 1:
+                break
+        self.table[position] = (best, depth)
+        self.table.move_to_end(position)
+        if len(self.table) > self.capacity:
+            self.table.popitem(last=False)
+        return best
+
+    def action_value(self, action, mc, mh, tc, th, depth=None):
+        """Value of declaring the action, both players responding optimally."""
+        depth = self.horizon if depth is None else depth
+        mc -= action.cost
+        if action not in self.claimants:
+            return self.block_phase(action, mc, mh, tc, th, depth)
+        unchallenged = self.block_phase(action, mc, mh, tc, th, depth)
+        if any(c in self.claimants[action] for c in mh):  # challenger loses
+            challenged = self.lose(
+                th, False, lambda h: self.block_phase(action, mc, mh, tc, h, depth)
+            )
+        else:  # bluff caught, the action fails
+            challenged = self.lose(
+                mh, True, lambda h: self.end_turn(mc, h, tc, th, depth)
+            )
+        return min(unchallenged, challenged)
+
+    def block_phase(self, action, mc, mh, tc, th, depth):
+        if action not in self.blockers:
+            return self.execute(action, mc, mh, tc, th, depth)
+        executed = self.execute(action, mc, mh, tc, th, depth)
+        accepted = self.end_turn(mc, mh, tc, th, depth)
+        if any(c in self.blockers[action] for c in th):  # block challenge fails
+            challenged = self.lose(
+                mh, True, lambda h: self.end_turn(mc, h, tc, th, depth)
+            )
+        else:
+            challenged = self.lose(
+                th, False, lambda h: self.execute(action, mc, mh, tc, h, depth)
+            )
+        return min(executed, max(accepted, challenged))
+
+    def execute(self, action, mc, mh, tc, th, depth):
+        if action in KILLS:
+            return self.lose(th, False, lambda h: self.end_turn(mc, mh, tc, h, depth))
+        elif action is Steal:
+            n = min(2, tc)
+            return self.end_turn(mc + n, mh, tc - n, th, depth)
+        else:
+            return self.end_turn(mc + GAINS[action], mh, tc, th, depth)
+
+    def lose(self, hand, mine, continuation):
+        """Value after the owner of the hand reveals the card that is best for them."""
+        if len(hand) == 1:
+            return -1 if mine else 1
+        values = [continuation(without(hand, c)) for c in set(hand)]
+        return max(values) if mine else min(values)
+
+    def end_turn(self, mc, mh, tc, th, depth):
+        return -self.value(tc, th, mc, mh, depth - 1)
+
+    # persistence
+    def save(self, path):
+        """Writes the transposition table atomically."""
+        write_atomic(path, pickle.dumps((self.signature(), list(self.table.items()))))
+
+    def load(self, path):
+        """Adds the positions of a saved table, which has to be of the same rules."""
+        with open(path, "rb") as f:
+            signature, items = pickle.load(f)
+        if signature != self.signature():
+            raise ValueError(f"{path} was solved for other rules: {signature}")
+        for position, entry in items[-self.capacity :]:
+            self.table[position] = entry
+        while len(self.table) > self.capacity:
+            self.table.popitem(last=False)
+
+
+_solvers = {}
+
+
+def get_solver(rules):
+    """Solver shared by all games with the same rules, so its table stays warm."""
+    if rules not in _solvers:
+        _solvers[rules] = EndgameSolver(rules)
+    return _solvers[rules]
+
+
+class AIController_Endgame(AIController_CardCounter):
+    """
+    Plays like AIController_CardCounter until only two players are left.
+    From then on, actions and reveals are chosen by the EndgameSolver, assuming the opponent holds their most likely characters.
+    """
+
+    __slots__ = ()
+
+    def in_endgame(self):
+        return len(self.game.alive_players) == 2
+
+    def position(self):
+        opponent = self.game.alive_players.excluding(self.player)[0]
+        return (
+            self.player.coins,
+            hand(self.player.influences),
+            opponent.coins,
+            self.assumed_hand(opponent),
+        )
+
+    def assumed_hand(self, opponent):
+        counter = self.beliefs()
+        likely = sorted(
+            (c for c in counter.total if counter.unseen(c) > 0),
+            key=lambda c: counter.probability(opponent, {c}),
+            reverse=True,
+        )
+        k = opponent.n_unrevealed
+        likely = (likely * k)[:k]  # repeats the likeliest if there are too few
+        return tuple(sorted(c.__name__ for c in likely))
+
+    def choose_action(self, action_types):
+        options = self.get_available_actions(action_types)
+        modeled = [a for a in options if a in MODELED]
+        if not self.in_endgame() or not modeled:
+            return super().choose_action(action_types)
+        solver = get_solver(self.game.rules)
+        position = self.position()
+        values = {a: solver.action_value(a, *position) for a in modeled}
+        best = max(values.values())
+        return self.rng.choice([a for a in modeled if values[a] == best])
+
+    def choose_reveal(self, influences):
+        if not self.in_endgame() or len(influences) == 1:
+            return super().choose_reveal(influences)
+        solver = get_solver(self.game.rules)
+        mc, mh, tc, th = self.position()
+        # approximation: the opponent moves next
+        return max(
+            influences,
+            key=lambda c: -solver.value(tc, th, mc, without(mh, type(c).__name__)),
+        )
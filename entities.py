@@ -1,16 +1,29 @@
-from random import shuffle, choice, sample
 from characters import Ambassador, Assassin, Captain, Contessa, Duke
 from actions import Coup, InterAction
-from utils import coinflip, generate_id
-import logging
+from utils import UNSEATED, Decision, coinflip, generate_id
+from events import MUTED, CardRevealed, CardReturned, InfluenceLost, PlayerEliminated
+import random
 
 
 class Player:
+    __slots__ = (
+        "controller",
+        "name",
+        "influences",
+        "n_unrevealed",
+        "coins",
+        "events",
+        "alive_players",
+    )
+
     def __init__(self, controller=None, name=None, coins=2, influences=None):
         self.controller = controller
         self.name = name
         self.influences = influences or []
+        self.n_unrevealed = sum(not c.revealed for c in self.influences)
         self.coins = coins
+        self.events = MUTED  # replaced by the game's EventBus once the game starts
+        self.alive_players = UNSEATED  # replaced by the game's AlivePlayers
         if self.controller is not None:
             self.controller.connect_player(self)
 
@@ -25,22 +38,13 @@ class Player:
 
     def connect_controller(self, controller):
         """
-        Sets the player's controller-attribute and makes sure, that the controller's player-attribute is matching.
-        The 'connect_player' method is exectued and mirros this behavior on the controller side.
-        The recursion is broken via AssertionError once both attributes are set.
-        If both attributes are matchingly set, the Error is not re-raised.
+        Sets the player's controller-attribute and the controller's player-attribute to each other.
+        Raises ValueError, without changing either side, if one of them is connected to someone else.
         """
-        assert self.controller is None, f"{self} is connected to {self.controller}"
-        self.controller = controller
-        try:
-            controller.connect_player(self)
-        except AssertionError:  # either connection established or not possible
-            if controller.player is not self:  # not possible
-                self.controller = None  # reset player-side
-                raise
+        connect(self, controller)
 
     def is_alive(self):
-        return not all(i.revealed for i in self.influences)
+        return self.n_unrevealed > 0
 
     def add_coins(self, n):
         assert isinstance(n, int)
@@ -59,37 +63,68 @@ class Player:
 
     def lose_influence(self):
         assert self.is_alive(), f"{self} has no influences left."
-        logging.info(f"{self} loses 1 influence.")
-        character = self.controller.choose_reveal(self.get_unrevealed_influences())
-        character.reveal()
+        influences = self.get_unrevealed_influences()
+        character = yield Decision(self, "choose_reveal", (influences,))
+        self.events.emit(InfluenceLost, self, character)
+        self.reveal(character)
         if not self.is_alive():
-            logging.info(f"{self} is out of the game.")
+            self.events.emit(PlayerEliminated, self)
+
+    def reveal(self, character):
+        character.reveal()
+        self.n_unrevealed -= 1
+        if self.n_unrevealed == 0:
+            self.alive_players.update(self)
+        self.events.emit(CardRevealed, self, character)
 
     def get_unrevealed_influences(self):
         return [i for i in self.influences if not i.revealed]
 
+    def copy(self):
+        """Returns an independent copy of the player and its cards, without controller."""
+        player = object.__new__(Player)  # skips counting the unrevealed influences
+        player.controller = None
+        player.name = self.name
+        player.influences = [c.copy() for c in self.influences]
+        player.n_unrevealed = self.n_unrevealed
+        player.coins = self.coins
+        player.events = MUTED
+        player.alive_players = UNSEATED
+        return player
+
     def add_card(self, character):
         self.influences.append(character)
+        if not character.revealed:
+            self.n_unrevealed += 1
+            if self.n_unrevealed == 1:  # e.g. after proving the last influence
+                self.alive_players.update(self)
 
     def remove_card(self, character):
         self.influences.remove(character)
+        if not character.revealed:
+            self.n_unrevealed -= 1
+            if self.n_unrevealed == 0:
+                self.alive_players.update(self)
 
     def challenge(self, action, block=False):
         if isinstance(self.controller, HumanController):
-            return self.controller.choose_reveal(self.get_unrevealed_influences())
+            influences = self.get_unrevealed_influences()
+            return (yield Decision(self, "choose_reveal", (influences,)))
         else:  # automaticly choose adequate character to reveal
+            rules = action.rules
+            proving = (rules.blockers if block else rules.claimants)[type(action)]
             for character in self.get_unrevealed_influences():
-                if block:
-                    if type(action) in character.blocks:
-                        return character  # character that can perform the block
-                elif type(action) in character.actions:
-                    return character  # character that can perform the action
+                if type(character) in proving:
+                    return character  # character that can perform the action or block
             else:
                 return None  # admit bluff
 
 
 class Deck:
-    def __init__(self, characters=None, multiplicity=3):
+    def __init__(self, characters=None, multiplicity=3, anonymous=False, rng=None):
+        self.anonymous = anonymous
+        self.rng = rng or random
+        self.events = MUTED  # replaced by the game's EventBus once the game starts
         self.characters = characters or {
             Ambassador,
             Assassin,
@@ -97,31 +132,61 @@ class Deck:
             Contessa,
             Duke,
         }  # on default (characters = None) use predefined set
-        self.cards = [c() for c in list(self.characters) * multiplicity]
+        # sorted, so that seeded decks do not depend on the classes' hashes
+        ordered = sorted(self.characters, key=lambda c: c.__name__)
+        self.cards = [self.new_card(c) for c in ordered * multiplicity]
         self.shuffle()
 
+    def copy(self, rng=None):
+        deck = object.__new__(Deck)  # skips creating and shuffling cards
+        deck.anonymous = True  # copies are for lookahead, replaced cards draw no names
+        deck.rng = rng or self.rng
+        deck.events = MUTED
+        deck.characters = self.characters
+        deck.cards = [c.copy() for c in self.cards]
+        return deck
+
+    def new_card(self, character_type):
+        return character_type(anonymous=self.anonymous)
+
     def shuffle(self):
-        shuffle(self.cards)
+        self.rng.shuffle(self.cards)
 
     def draw(self, n=1):
         assert isinstance(n, int)
         assert n > 0
         if n == 1:
-            return self.cards.pop(0)
+            return self.cards.pop()  # the top of the deck is the end of the list
         elif n <= len(self.cards):
-            return [self.cards.pop(0) for i in range(n)]
+            return [self.cards.pop() for i in range(n)]
         else:
             raise ValueError(f"Not enough cards in deck to draw {n}")
 
     def put_back(self, character):
+        """
+        Puts the card back at a uniformly random position in O(1).
+        This is one step of an inside-out Fisher-Yates shuffle, so a shuffled deck stays uniformly shuffled.
+        """
         self.cards.append(character)
-        self.shuffle()
+        i = self.rng.randrange(len(self.cards))
+        self.cards[i], self.cards[-1] = self.cards[-1], self.cards[i]
+        self.events.emit(CardReturned, character, i)
 
 
 class BaseController:
-    def __init__(self):
-        self.id = generate_id()
+    __slots__ = ("_id", "player", "rng", "game")
+
+    def __init__(self, rng=None):
+        self._id = None
         self.player = None
+        self.rng = rng or random
+        self.game = None  # set once the game starts
+
+    @property
+    def id(self):
+        if self._id is None:  # only generated when needed, e.g. for human players
+            self._id = generate_id()
+        return self._id
 
     def __str__(self):
         name = self.__class__.__name__
@@ -134,22 +199,13 @@ class BaseController:
         return f"{self.__class__.__name__}()"
 
     def connect_player(self, player):
-        """
-        Sets the controller's player-attribute and makes sure, that the player's controller attribute is matching.
-        The 'connect_controller' method is exectued and mirros this behavior on the player side.
-        The recursion is broken via AssertionError once both attributes are set.
-        If both attributes are matchingly set, the Error is not re-raised.
-        """
-        assert self.player is None, f"{self} is connected to {self.player}"
-        self.player = player
-        try:
-            player.connect_controller(self)
-        except AssertionError:  # either connection established or not possible
-            if player.controller is not self:  # not possible
-                self.player = None  # reset controller-side
-                raise
+        """Mirrors Player.connect_controller on the controller side."""
+        connect(player, self)
 
     def get_available_actions(self, action_types):
+        rules = self.game.rules
+        if action_types is rules.action_types:
+            return rules.available(self.player.coins)
         budget = self.player.coins
         if budget < 10:
             return [a for a in action_types if a.cost <= budget]
@@ -158,39 +214,42 @@ class BaseController:
 
 
 class AIController_Random(BaseController):
+    __slots__ = ()
+
     def choose_action(self, action_types):
         options = self.get_available_actions(action_types)
-        return choice(options)
+        return self.rng.choice(options)
 
     def choose_target(self, players):
-        alive_players = [p for p in players if p.is_alive()]
-        competitors = list(set(alive_players) - {self.player})
-        return choice(competitors)
+        return self.game.alive_players.choose_excluding(self.player, self.rng)
 
     def choose_exchange(self, cards, n):
-        return sample(cards, n)
+        return self.rng.sample(cards, n)
 
     def choose_reveal(self, influences):
-        return choice(influences)
+        return self.rng.choice(influences)
 
     def decide_challenge(self, action):
-        return coinflip()
+        return coinflip(self.rng)
 
     def decide_block(self, action):
-        return coinflip()
+        return coinflip(self.rng)
 
     def decide_challenge_block(self, action):
-        return coinflip()
+        return coinflip(self.rng)
 
 
 class AIController_Defensive(AIController_Random):
+    __slots__ = ()
+
     def choose_action(self, action_types):
         options = self.get_available_actions(action_types)
-        peaceful_options = [o for o in options if InterAction not in o.mro()]
+        targeted = self.game.rules.targeted
+        peaceful_options = [o for o in options if not targeted[o]]
         if len(peaceful_options) > 0:
-            return choice(peaceful_options)
+            return self.rng.choice(peaceful_options)
         else:
-            return choice(options)
+            return self.rng.choice(options)
 
     def decide_challenge(self, action):
         return False
@@ -206,10 +265,13 @@ class AIController_Defensive(AIController_Random):
 
 
 class AIController_Offensive(AIController_Random):
+    __slots__ = ()
+
     def choose_action(self, action_types):
         options = self.get_available_actions(action_types)
-        options = [o for o in options if InterAction in o.mro()]
-        return choice(options)
+        targeted = self.game.rules.targeted
+        options = [o for o in options if targeted[o]]
+        return self.rng.choice(options)
 
     def decide_challenge(self, action):
         if isinstance(action, InterAction):
@@ -222,6 +284,8 @@ class AIController_Offensive(AIController_Random):
 
 
 class AIController_Gullible(AIController_Random):
+    __slots__ = ()
+
     def decide_challenge(self, action):
         return False
 
@@ -230,6 +294,8 @@ class AIController_Gullible(AIController_Random):
 
 
 class AIController_Skeptic(AIController_Random):
+    __slots__ = ()
+
     def decide_challenge(self, action):
         return True
 
@@ -238,40 +304,48 @@ class AIController_Skeptic(AIController_Random):
 
 
 class AIController_Opressor(AIController_Random):
+    __slots__ = ()
+
     def choose_target(self, players):
-        alive_players = [p for p in players if p.is_alive()]
-        competitors = list(set(alive_players) - {self.player})
+        competitors = self.game.alive_players.excluding(self.player)
         targets = self.choose_weakest(competitors)
-        return choice(targets)
+        return self.rng.choice(targets)
 
     def choose_weakest(self, competitors):
-        min_i = min([len(c.get_unrevealed_influences()) for c in competitors])
-        targets = [
-            c for c in competitors if len(c.get_unrevealed_influences()) == min_i
-        ]
+        min_i = min([c.n_unrevealed for c in competitors])
+        targets = [c for c in competitors if c.n_unrevealed == min_i]
         min_c = min([t.coins for t in targets])
         targets = [t for t in targets if t.coins == min_c]
         return targets
 
 
 class AIController_Revolutionary(AIController_Random):
+    __slots__ = ()
+
     def choose_target(self, players):
-        alive_players = [p for p in players if p.is_alive()]
-        competitors = list(set(alive_players) - {self.player})
+        competitors = self.game.alive_players.excluding(self.player)
         targets = self.choose_strongest(competitors)
-        return choice(targets)
+        return self.rng.choice(targets)
 
     def choose_strongest(self, competitors):
-        max_i = max([len(c.get_unrevealed_influences()) for c in competitors])
-        targets = [
-            c for c in competitors if len(c.get_unrevealed_influences()) == max_i
-        ]
+        max_i = max([c.n_unrevealed for c in competitors])
+        targets = [c for c in competitors if c.n_unrevealed == max_i]
         max_c = max([t.coins for t in targets])
         targets = [t for t in targets if t.coins == max_c]
         return targets
 
 
-def get_random_AI():
+def connect(player, controller):
+    """Links player and controller both ways, both sides are checked before either is changed."""
+    if player.controller not in (None, controller):
+        raise ValueError(f"{player} is connected to {player.controller}")
+    if controller.player not in (None, player):
+        raise ValueError(f"{controller} is connected to {controller.player}")
+    player.controller = controller
+    controller.player = player
+
+
+def get_random_AI(rng=None):
     AIs = [
         AIController_Random,
         AIController_Defensive,
@@ -281,8 +355,8 @@ def get_random_AI():
         AIController_Opressor,
         AIController_Revolutionary,
     ]
-    return choice(AIs)()
+    return (rng or random).choice(AIs)(rng=rng)
 
 
 class HumanController(BaseController):
-    pass
+    __slots__ = ()
@@ -0,0 +1,187 @@
+from collections import Counter
+from typing import NamedTuple
+import logging
+
+
+# events
+class ActionDeclared(NamedTuple):
+    player: object
+    action: object
+
+
+class ActionExecuted(NamedTuple):
+    player: object
+    action: object
+
+
+class ActionFailed(NamedTuple):
+    player: object
+    action: object
+    target: object
+
+
+class Challenged(NamedTuple):
+    challenger: object
+    player: object
+    action: object
+
+
+class ChallengeResolved(NamedTuple):
+    player: object
+    action: object
+    bluff: bool
+
+
+class Blocked(NamedTuple):
+    blocker: object
+    player: object
+    action: object
+
+
+class BlockChallenged(NamedTuple):
+    challenger: object
+    blocker: object
+    action: object
+
+
+class BlockChallengeResolved(NamedTuple):
+    blocker: object
+    action: object
+    bluff: bool
+
+
+class CardReturned(NamedTuple):
+    character: object
+    position: int
+
+
+class Exchanged(NamedTuple):
+    player: object
+    options: list
+    choices: list
+
+
+class CardReplaced(NamedTuple):
+    player: object
+    character: object
+
+
+class InfluenceLost(NamedTuple):
+    player: object
+    character: object
+
+
+class CardRevealed(NamedTuple):
+    player: object
+    character: object
+
+
+class PlayerEliminated(NamedTuple):
+    player: object
+
+
+class GameOver(NamedTuple):
+    winner: object
+
+
+# buses
+def ignore(event_type, *args):
+    pass
+
+
+class EventBus:
+    """
+    Synchronous dispatcher of game events to subscribed sinks (callables taking one event).
+    Events are emitted as emit(EventType, *fields) and only instantiated if there are sinks,
+    without sinks emitting is a call to a no-op function.
+    """
+
+    __slots__ = ("sinks", "emit")
+
+    def __init__(self, *sinks):
+        self.sinks = []
+        self.emit = ignore
+        for sink in sinks:
+            self.subscribe(sink)
+
+    def subscribe(self, sink):
+        self.sinks.append(sink)
+        self.emit = self.dispatch
+        return sink
+
+    def unsubscribe(self, sink):
+        self.sinks.remove(sink)
+        if not self.sinks:
+            self.emit = ignore
+
+    def dispatch(self, event_type, *args):
+        event = event_type(*args)
+        for sink in self.sinks:
+            sink(event)
+
+
+class MutedBus:
+    """Stand-in for objects that are not part of a Game, drops every event."""
+
+    __slots__ = ()
+    emit = staticmethod(ignore)
+
+
+MUTED = MutedBus()
+
+
+# sinks
+class TextLogSink:
+    """Writes events to a logger in the human readable format of events.log."""
+
+    formats = {
+        ActionDeclared: "{0.player} wants to execute {0.action}.",
+        ActionExecuted: "{0.player} executed {0.action}.",
+        ActionFailed: "{0.player}'s {0.action} could not be executed, since {0.target} is already out of the game.",
+        Challenged: "{0.challenger} challenges {0.player}'s {0.action}.",
+        Blocked: "{0.blocker} blocks {0.player}'s attempt at {0.action}.",
+        BlockChallenged: "{0.challenger} challenges {0.blocker}'s block.",
+        CardReplaced: "{0.player} replaces {0.character}.",
+        InfluenceLost: "{0.player} loses 1 influence.",
+        CardRevealed: "{0.character} was revealed.",
+        PlayerEliminated: "{0.player} is out of the game.",
+        GameOver: "{0.winner} wins!",
+    }
+    levels = {ActionFailed: logging.WARNING}
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger()
+
+    def __call__(self, event):
+        level = self.levels.get(type(event), logging.INFO)
+        if not self.logger.isEnabledFor(level):
+            return  # don't pay for formatting
+        message = self.format(event)
+        if message is not None:
+            self.logger.log(level, message)
+
+    def format(self, event):
+        if isinstance(event, ChallengeResolved):
+            verdict = "was a bluff" if event.bluff else "was not a bluff"
+            return f"{event.player}'s {event.action} {verdict}."
+        elif isinstance(event, BlockChallengeResolved):
+            verdict = "was a bluff" if event.bluff else "was not a bluff"
+            return f"{event.blocker}'s block {verdict}."
+        elif type(event) in self.formats:
+            return self.formats[type(event)].format(event)
+        else:
+            return None  # events without a line in events.log, e.g. CardReturned
+
+
+class Recorder(list):
+    """Keeps every event in memory."""
+
+    def __call__(self, event):
+        self.append(event)
+
+
+class CounterSink(Counter):
+    """Counts the events per type name."""
+
+    def __call__(self, event):
+        self[type(event).__name__] += 1
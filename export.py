@@ -0,0 +1,221 @@
+"""
+Columnar export of game histories with NumPy (optional dependency).
+
+TurnExporter is an event sink writing one row per declared action into chunks of fixed dtypes,
+each chunk a directory of one .npy file per column, so they can be read memory-mapped:
+
+game        int64  id of the game, as passed to attach
+round       int32  rounds completed before the turn
+seat        int16  seat of the executing player
+action      int8   index of the action type in schema.json's actions
+target      int16  seat of the target, -1 for untargeted actions
+challenged  bool   whether the action was challenged
+blocked     bool   whether the action was blocked
+outcome     int8   index in OUTCOMES
+
+Memory is bounded by chunk_size rows, a chunk is written (atomically, by renaming its directory)
+as soon as it is full and on close.
+"""
+from actions import Income, ForeignAid, Tax, Coup, Assassinate, Steal, Exchange
+from events import (
+    ActionDeclared,
+    ActionExecuted,
+    ActionFailed,
+    Blocked,
+    BlockChallengeResolved,
+    Challenged,
+    ChallengeResolved,
+)
+from simulation import game_rng, setup_game
+from utils import atomic_path, write_atomic
+import json
+import os
+import random
+import numpy as np
+
+COLUMNS = {
+    "game": np.int64,
+    "round": np.int32,
+    "seat": np.int16,
+    "action": np.int8,
+    "target": np.int16,
+    "challenged": np.bool_,
+    "blocked": np.bool_,
+    "outcome": np.int8,
+}
+# unresolved: the game ended before the action was resolved, e.g. the last opponent lost a challenge
+OUTCOMES = ["unresolved", "executed", "bluff_caught", "blocked", "target_out"]
+UNRESOLVED, EXECUTED, BLUFF_CAUGHT, BLOCKED, TARGET_OUT = range(len(OUTCOMES))
+ACTIONS = [Income, ForeignAid, Tax, Coup, Assassinate, Steal, Exchange]
+
+
+class TurnExporter:
+    """
+    Event sink exporting the turns of games into the directory path, one game at a time:
+
+        with TurnExporter("turns") as exporter:
+            for i, game in enumerate(games):
+                exporter.attach(game, i)
+                game.run()
+
+    Action types that are not in action_types are added to the schema as they appear.
+    """
+
+    def __init__(self, path, chunk_size=1 << 20, action_types=ACTIONS):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.actions = {a: i for i, a in enumerate(action_types)}
+        self.columns = {
+            name: np.empty(chunk_size, dtype) for name, dtype in COLUMNS.items()
+        }
+        self.n = 0  # rows in the current chunk, the last one may still change
+        os.makedirs(path, exist_ok=True)
+        self.n_chunks = len(chunk_paths(path))
+        self.game = None
+
+    def attach(self, game, game_id):
+        """Exports the turns of the game from now on, under the given id."""
+        if self.game is not None:
+            self.game.events.unsubscribe(self)
+        self.game = game
+        self.game_id = game_id
+        self.seats = {id(p): i for i, p in enumerate(game.players)}
+        game.events.subscribe(self)
+
+    def __call__(self, event):
+        t = type(event)
+        if t is ActionDeclared:
+            self.declared(event.player, event.action)
+            return
+        row = self.n - 1
+        columns = self.columns
+        if t is ActionExecuted:
+            columns["outcome"][row] = EXECUTED
+        elif t is Challenged:
+            columns["challenged"][row] = True
+        elif t is ChallengeResolved:
+            if event.bluff:
+                columns["outcome"][row] = BLUFF_CAUGHT
+        elif t is Blocked:
+            columns["blocked"][row] = True
+            columns["outcome"][row] = BLOCKED
+        elif t is BlockChallengeResolved:
+            if event.bluff:  # the action goes on
+                columns["outcome"][row] = UNRESOLVED
+        elif t is ActionFailed:
+            columns["outcome"][row] = TARGET_OUT
+
+    def declared(self, player, action):
+        if self.n == self.chunk_size:
+            self.flush()
+        action_type = type(action)
+        if action_type not in self.actions:
+            self.actions[action_type] = len(self.actions)
+        target = getattr(action, "target_player", None)
+        row = self.n
+        columns = self.columns
+        columns["game"][row] = self.game_id
+        columns["round"][row] = self.game.rounds_completed
+        columns["seat"][row] = self.seats[id(player)]
+        columns["action"][row] = self.actions[action_type]
+        columns["target"][row] = -1 if target is None else self.seats[id(target)]
+        columns["challenged"][row] = False
+        columns["blocked"][row] = False
+        columns["outcome"][row] = UNRESOLVED
+        self.n += 1
+
+    def flush(self):
+        """Writes the rows collected so far as a chunk."""
+        if self.n == 0:
+            return
+        name = f"{self.n_chunks:06d}"
+        with atomic_path(os.path.join(self.path, name)) as temporary:
+            os.makedirs(temporary)
+            for column, values in self.columns.items():
+                np.save(os.path.join(temporary, f"{column}.npy"), values[: self.n])
+        self.n_chunks += 1
+        self.n = 0
+        self.write_schema()
+
+    def write_schema(self):
+        schema = {
+            "columns": {name: np.dtype(t).name for name, t in COLUMNS.items()},
+            "actions": [a.__name__ for a in self.actions],
+            "outcomes": OUTCOMES,
+        }
+        path = os.path.join(self.path, "schema.json")
+        write_atomic(path, json.dumps(schema, indent=2))
+
+    def close(self):
+        self.flush()
+        if self.game is not None:
+            self.game.events.unsubscribe(self)
+            self.game = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def chunk_paths(path):
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path) if name.isdigit()
+    )
+
+
+def iter_chunks(path, mmap_mode="r"):
+    """Yields the chunks of an export as dicts of column name to (memory-mapped) array."""
+    for chunk in chunk_paths(path):
+        yield {
+            column: np.load(os.path.join(chunk, f"{column}.npy"), mmap_mode=mmap_mode)
+            for column in COLUMNS
+        }
+
+
+def load_turns(path):
+    """All turns of an export as a dict of column name to array."""
+    chunks = list(iter_chunks(path))
+    return {
+        column: np.concatenate([c[column] for c in chunks])
+        if chunks
+        else np.empty(0, dtype)
+        for column, dtype in COLUMNS.items()
+    }
+
+
+def load_schema(path):
+    with open(os.path.join(path, "schema.json")) as f:
+        return json.load(f)
+
+
+def export_games(
+    player_factories, n_games, path, seed=None, chunk_size=1 << 20, **game_kwargs
+):
+    """Plays n_games headless games (seeded like simulation.simulate) and exports their turns."""
+    if seed is None:
+        seed = random.getrandbits(64)
+    with TurnExporter(path, chunk_size) as exporter:
+        for i in range(n_games):
+            game = setup_game(player_factories, game_rng(seed, i), **game_kwargs)
+            exporter.attach(game, i)
+            game.run()
+
+
+def main(path="turns", n_games=10000):
+    from entities import get_random_AI
+    import time
+
+    start = time.perf_counter()
+    export_games([get_random_AI] * 4, n_games, path, seed=0)
+    elapsed = time.perf_counter() - start
+    turns = load_turns(path)
+    schema = load_schema(path)
+    print(f"exported {len(turns['game'])} turns in {elapsed:.1f}s to {path}/")
+    for i, name in enumerate(schema["outcomes"]):
+        print(f"{name}: {np.count_nonzero(turns['outcome'] == i)}")
+
+
+if __name__ == "__main__":
+    main()
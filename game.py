@@ -1,21 +1,55 @@
 from entities import Player, Deck, get_random_AI
 from actions import Income, ForeignAid, Tax, Coup, Assassinate, Steal, Exchange
-from actions import BlockableAction, CharacterAction, InterAction
+from utils import AlivePlayers, Decision, run_steps
 from utils import get_challenger, get_blocker, get_block_challenger
+from rules import compile_rules
+from events import EventBus, TextLogSink
+from typing import NamedTuple
+import events
 import logging
+import random
+import time
 
 
-class GameOver(BaseException):
-    pass
+UNDECIDED = object()  # marks responders that still have to be asked for
+
+
+class GameState(NamedTuple):
+    """
+    Compact, immutable value of everything that changes during a game.
+    influences: per player a tuple of (character type, revealed) pairs
+    deck: character types of the cards in the deck, the top card is the last one
+    n_actions: length of the action history
+    """
+
+    coins: tuple
+    influences: tuple
+    deck: tuple
+    rounds_completed: int
+    player_turn: int
+    n_actions: int
 
 
 class Game:
     def __init__(
-        self, players, deck, n_influences=2, starting_coins=2, action_types=None
+        self,
+        players,
+        deck,
+        n_influences=2,
+        starting_coins=2,
+        action_types=None,
+        rng=None,
+        events=None,
+        profile=None,
     ):
         # base setup
         self.players = players
         self.deck = deck
+        self.rng = rng or random
+        self.set_events(events or EventBus())
+        for player in self.players:
+            if player.controller is not None:
+                player.controller.game = self
         self.action_types = action_types or [
             Income,
             ForeignAid,
@@ -25,13 +59,94 @@ class Game:
             Steal,
             Exchange,
         ]
+        self.rules = compile_rules(self.action_types, self.deck.characters)
+        self.action_types = self.rules.action_types  # shared, see get_available_actions
         self.n_influences = n_influences
         self.distribute_cards()
         self.distribute_coins(starting_coins)
+        self.index_players()
         # track game state
         self.actions = []
         self.rounds_completed = 0
         self.player_turn = 0
+        self.process = None  # generator of the game's rule steps, see step
+        self.pending = None  # Decision the game is waiting for
+        self.profile = profile  # optional profiling.Profile, timing phases and decisions
+        self.phase = None
+        self.phase_start = 0.0
+
+    def set_events(self, events):
+        self.events = events
+        self.deck.events = events
+        for player in self.players:
+            player.events = events
+
+    def snapshot(self):
+        return GameState(
+            coins=tuple(p.coins for p in self.players),
+            influences=tuple(
+                tuple((type(c), c.revealed) for c in p.influences)
+                for p in self.players
+            ),
+            deck=tuple(type(c) for c in self.deck.cards),
+            rounds_completed=self.rounds_completed,
+            player_turn=self.player_turn,
+            n_actions=len(self.actions),
+        )
+
+    def restore(self, state):
+        """
+        Resets the game to a GameState taken from this game by snapshot.
+        Cards are recreated from their types, so their names do not survive a restore.
+        The action history is truncated to its length at the time of the snapshot.
+        A game advanced by step is stopped, running it again starts at the restored player_turn.
+        """
+        if self.process is not None:
+            self.process.close()
+        self.process = None
+        self.pending = None
+        for i, player in enumerate(self.players):
+            player.coins = state.coins[i]
+            player.influences = []
+            player.n_unrevealed = 0
+            for character_type, revealed in state.influences[i]:
+                player.add_card(character_type.blank(revealed))
+        self.index_players()
+        self.deck.cards = [c.blank() for c in state.deck]
+        self.rounds_completed = state.rounds_completed
+        self.player_turn = state.player_turn
+        del self.actions[state.n_actions :]
+
+    def clone(self, rng=None):
+        """
+        Returns an independent copy of the current state, e.g. for lookahead.
+        The copy has no controllers, no action history and an EventBus without sinks.
+        Its deck is anonymous, so cards replaced in the copy do not draw names.
+        """
+        game = object.__new__(Game)  # skips dealing cards
+        game.players = [p.copy() for p in self.players]
+        game.deck = self.deck.copy(rng)
+        game.rng = rng or self.rng
+        game.set_events(EventBus())
+        game.index_players()
+        game.action_types = self.action_types
+        game.rules = self.rules
+        game.n_influences = self.n_influences
+        game.actions = []
+        game.rounds_completed = self.rounds_completed
+        game.player_turn = self.player_turn
+        game.process = None
+        game.pending = None
+        game.profile = None
+        game.phase = None
+        game.phase_start = 0.0
+        return game
+
+    def index_players(self):
+        """Indexes the alive players, the index is kept up to date by Player.reveal."""
+        self.alive_players = AlivePlayers(self.players)
+        for player in self.players:
+            player.alive_players = self.alive_players
 
     def distribute_cards(self):
         for player in self.players:
@@ -43,76 +158,172 @@ class Game:
             player.coins = starting_coins
 
     def win_condition_met(self):
-        alive_players = self.get_alive_players()
-        if len(alive_players) == 1:
-            return True
-        else:
-            return False
+        return len(self.alive_players) == 1
 
     def get_alive_players(self):
-        return [p for p in self.players if p.is_alive()]
+        return list(self.alive_players)
 
-    def run(self):
-        while True:
-            try:
-                self.run_round()
-            except GameOver:
-                logging.info(f"{self.get_alive_players()[0]} wins!")
-                return
+    def step(self, answer=None):
+        """
+        Advances the game to its next decision point and returns the pending Decision, or None once the game is over.
+        The answer to a Decision has to be passed to the following call, e.g. step(decision.ask()).
+        This allows to interleave many games in one thread or to pause them at any decision.
+        """
+        if self.process is None:
+            self.process = self.play(self.player_turn)
+        try:
+            self.pending = self.process.send(answer)
+        except StopIteration:  # game over
+            self.pending = None
+        return self.pending
 
-    def run_round(self):
-        for i, player in enumerate(self.players):
+    def run(self, first_seat=None):
+        """
+        Plays until the game is over, starting the current round at first_seat (default: player_turn).
+        A game already advanced by step is resumed at its pending decision instead, first_seat is ignored then.
+        """
+        profile = self.profile
+        if self.process is None:
+            first_seat = self.player_turn if first_seat is None else first_seat
+            self.process = self.play(first_seat)
+            decision = self.step()
+        else:
+            decision = self.pending
+        while decision is not None:
+            if profile is None:
+                answer = decision.ask()
+            else:
+                start = time.perf_counter()
+                answer = decision.ask()
+                profile.observe_decision(decision, time.perf_counter() - start)
+            decision = self.step(answer)
+
+    def enter_phase(self, phase):
+        """Closes the running phase of the turn in the profile and starts the next one, None ends the turn."""
+        now = time.perf_counter()
+        if self.phase is not None:
+            self.profile.observe_phase(self.phase, now - self.phase_start)
+        self.phase = phase
+        self.phase_start = now
+
+    def play(self, first_seat=0):
+        """Rule steps of the whole game, starting the current round at first_seat."""
+        while not (yield from self.play_round(first_seat)):
+            first_seat = 0
+        self.events.emit(events.GameOver, self.alive_players[0])
+
+    def run_round(self, first_seat=0):
+        return run_steps(self.play_round(first_seat))
+
+    def play_round(self, first_seat=0):
+        """Rule steps of a round, returns True once the game is over."""
+        for i in range(first_seat, len(self.players)):
+            player = self.players[i]
             if self.win_condition_met():
-                raise GameOver
+                return True
             elif not player.is_alive():
                 continue
             else:
                 self.player_turn = i
-                self.run_turn(player)
+                if (yield from self.play_turn(player)):
+                    return True  # game ended in the middle of the turn
         self.rounds_completed += 1
+        return False
 
     def run_turn(self, player):
-        action_type = player.controller.choose_action(self.action_types)
-        action_kwargs = {"executing_player": player, "deck": self.deck}
+        return run_steps(self.play_turn(player))
+
+    def play_turn(self, player):
+        """Rule steps of a turn, returns True if the game ended in the middle of it."""
+        action = yield from self.declare_action(player)
+        ended = yield from self.resolve_action(action)
+        if self.profile is not None:
+            self.enter_phase(None)
+        return ended
+
+    def declare_action(self, player, action_type=None, target=None):
+        """
+        Rule steps letting the player declare an action, already decided parts can be passed in.
+        Returns the action object, which is added to the game's history.
+        """
+        if action_type is None:
+            if self.profile is not None:
+                self.enter_phase("action")
+            action_type = yield Decision(player, "choose_action", (self.action_types,))
+        action_kwargs = {
+            "executing_player": player,
+            "deck": self.deck,
+            "rules": self.rules,
+        }
 
-        if InterAction in action_type.mro():
-            target = player.controller.choose_target(self.players)
+        if self.rules.targeted[action_type]:
+            if target is None:
+                if self.profile is not None:
+                    self.enter_phase("target")
+                target = yield Decision(player, "choose_target", (self.players,))
             action_kwargs["target_player"] = target
 
         # init action object
         action = action_type(**action_kwargs)
         self.actions.append(action)
+        return action
 
+    def resolve_action(
+        self,
+        action,
+        challenger=UNDECIDED,
+        blocker=UNDECIDED,
+        block_challenger=UNDECIDED,
+    ):
+        """
+        Rule steps of the challenge and block phases of a declared action and of its execution, if it survives them.
+        Responders that are UNDECIDED are asked for as usual, None means nobody responds.
+        Passing responders in allows to resume a turn in the middle, e.g. for lookahead on a cloned game.
+        Returns True if the game ended in the middle of the turn.
+        """
         # eventual challenge of the action
-        if isinstance(action, CharacterAction):
-            challenger = get_challenger(
-                action=action,
-                alive_players=self.get_alive_players(),
-            )
+        rules = self.rules
+        if rules.challengeable[type(action)]:
+            if self.profile is not None:
+                self.enter_phase("challenge")
+            if challenger is UNDECIDED:
+                challenger = yield from get_challenger(
+                    action=action,
+                    alive_players=self.alive_players,
+                    rng=self.rng,
+                )
             if challenger is not None:
-                if action.challenge(challenger):
+                if (yield from action.challenge(challenger)):
                     action.handled = True
                     return  # challenge succeeded, turn ends
 
         if self.win_condition_met():
-            raise GameOver  # last competitor might drop out after lost challenge
+            return True  # last competitor might drop out after lost challenge
 
         # eventual block of the action
-        if isinstance(action, BlockableAction):
-            blocker = get_blocker(
-                action=action,
-                alive_players=self.get_alive_players(),
-            )
+        if rules.blockable[type(action)]:
+            if self.profile is not None:
+                self.enter_phase("block")
+            if blocker is UNDECIDED:
+                blocker = yield from get_blocker(
+                    action=action,
+                    alive_players=self.alive_players,
+                    rng=self.rng,
+                )
             if not blocker is None:
                 action.block(blocker)
 
                 # eventual challenge of the block
-                block_challenger = get_block_challenger(
-                    action=action,
-                    alive_players=self.get_alive_players(),
-                )
+                if self.profile is not None:
+                    self.enter_phase("block_challenge")
+                if block_challenger is UNDECIDED:
+                    block_challenger = yield from get_block_challenger(
+                        action=action,
+                        alive_players=self.alive_players,
+                        rng=self.rng,
+                    )
                 if block_challenger is not None:
-                    if not action.challenge_block(block_challenger):
+                    if not (yield from action.challenge_block(block_challenger)):
                         action.handled = True
                         return  # challenge failed, blocking worked, turn ends
                 else:
@@ -120,7 +331,9 @@ class Game:
                     return  # action blocked, turn ends
 
         # DO IT
-        action.execute()
+        if self.profile is not None:
+            self.enter_phase("execute")
+        yield from action.execute()
 
 
 def main(list_of_player_names):
@@ -133,7 +346,7 @@ def main(list_of_player_names):
 
     deck = Deck()
     players = [Player(get_random_AI(), name) for name in list_of_player_names]
-    game = Game(players, deck)
+    game = Game(players, deck, events=EventBus(TextLogSink()))
     game.run()
 
 
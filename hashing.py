@@ -0,0 +1,216 @@
+"""
+Canonical encoding and incremental hashing of game positions, e.g. for transposition tables.
+
+Positions are equivalent where the rules can't tell them apart:
+- seats are rotated so that the player whose turn it is (game.player_turn) comes first,
+- cards are counted per character, their names and order in a hand don't matter,
+- the deck is counted per character as well, since it stays uniformly shuffled (see Deck.put_back).
+  Cards that are in no hand count as deck, e.g. the options of an exchange while it is decided.
+The round count and the action history are not part of a position.
+"""
+from events import ActionDeclared, Blocked, BlockChallenged, Challenged
+import random
+
+MAX_GAIN = 3  # most coins a player can gain in a turn (Tax)
+KEY_BITS = 64
+
+
+def character_order(game):
+    return sorted(game.deck.characters, key=lambda c: c.__name__)
+
+
+def coin_limit(game):
+    """
+    Exclusive upper bound of the coins of any player: coins only grow in a player's own turn,
+    and by at most MAX_GAIN, unless they have to Coup. Has to be called before the first turn.
+    """
+    starting = max(p.coins for p in game.players)
+    return max(starting, game.rules.forced_coup - 1 + MAX_GAIN) + 1
+
+
+def check_coins(coins, limit):
+    if not 0 <= coins < limit:
+        raise ValueError(f"{coins} coins are out of the range of the encoding (< {limit})")
+
+
+def card_totals(game):
+    """Number of cards per character in the whole game, only complete between turns."""
+    totals = {c: 0 for c in game.deck.characters}
+    for card in game.deck.cards:
+        totals[type(card)] += 1
+    for player in game.players:
+        for card in player.influences:
+            totals[type(card)] += 1
+    return totals
+
+
+def hand_counts(player, characters):
+    """Unrevealed and revealed cards of the player per character, in the order of characters."""
+    hidden = dict.fromkeys(characters, 0)
+    revealed = dict.fromkeys(characters, 0)
+    for card in player.influences:
+        if card.revealed:
+            revealed[type(card)] += 1
+        else:
+            hidden[type(card)] += 1
+    return list(hidden.values()), list(revealed.values())
+
+
+class StateEncoder:
+    """
+    Bit-packs positions of games with the same players and cards into ints.
+    Per seat (from the player to move on) its coins and its hidden and revealed cards per character,
+    then the cards of the deck per character, all in fixed-width fields.
+    """
+
+    def __init__(self, game):
+        self.characters = character_order(game)
+        self.totals = card_totals(game)
+        self.count_bits = max(self.totals.values()).bit_length()
+        self.n_players = len(game.players)
+        self.coin_limit = coin_limit(game)
+        self.coin_bits = (self.coin_limit - 1).bit_length()
+        player_bits = self.coin_bits + 2 * len(self.characters) * self.count_bits
+        deck_bits = len(self.characters) * self.count_bits
+        self.n_bits = self.n_players * player_bits + deck_bits
+
+    def encode(self, game):
+        bits = self.count_bits
+        code = 0
+        n = self.n_players
+        deck = [self.totals[c] for c in self.characters]
+        for i in range(n):
+            player = game.players[(game.player_turn + i) % n]
+            check_coins(player.coins, self.coin_limit)
+            code = code << self.coin_bits | player.coins
+            hidden, revealed = hand_counts(player, self.characters)
+            for count in hidden + revealed:
+                code = code << bits | count
+            for j in range(len(deck)):
+                deck[j] -= hidden[j] + revealed[j]
+        for count in deck:
+            code = code << bits | count
+        return code
+
+    def encode_bytes(self, game):
+        return self.encode(game).to_bytes((self.n_bits + 7) // 8, "little")
+
+
+class ZobristHasher:
+    """
+    64-bit Zobrist hash of a game's position, kept up to date from the game's events.
+    The hash is maintained for every seat rotation at once: an update costs O(players),
+    reading the hash of the current position is O(1).
+    Only players taking part in a turn can change: its events mark them, they are rehashed on every read until the next turn.
+    Keys are drawn from a seeded stream, so hashes are stable across processes for the same seed.
+    Has to be created between turns, after Game.restore call reset.
+    """
+
+    def __init__(self, game, seed=0):
+        self.game = game
+        self.characters = character_order(game)
+        n = len(game.players)
+        self.totals = totals = card_totals(game)
+        rng = random.Random(f"zobrist/{seed}")
+        key = lambda: rng.getrandbits(KEY_BITS)
+        # per position relative to the player to move: coins, and the k-th hidden / revealed card of a character
+        self.coin_limit = coin_limit(game)
+        self.coin_keys = [[key() for c in range(self.coin_limit)] for rel in range(n)]
+        self.hidden_keys = [
+            [[key() for k in range(totals[c])] for c in self.characters]
+            for rel in range(n)
+        ]
+        self.revealed_keys = [
+            [[key() for k in range(totals[c])] for c in self.characters]
+            for rel in range(n)
+        ]
+        self.deck_keys = [
+            [key() for k in range(totals[c] + 1)] for c in self.characters
+        ]
+        self.seats = {id(p): i for i, p in enumerate(game.players)}
+        self.handlers = {
+            ActionDeclared: self.on_declared,
+            Challenged: self.on_challenged,
+            Blocked: self.on_blocked,
+            BlockChallenged: self.on_challenged,
+        }
+        self.reset()
+        game.events.subscribe(self)
+
+    def reset(self):
+        """Rehashes the whole position."""
+        n = len(self.game.players)
+        self.hashes = [0] * n  # per rotation, i.e. per seat to move
+        self.counts = [None] * n  # per seat the last hashed (coins, hidden, revealed)
+        self.dirty = set()  # seats taking part in the current turn
+        # cards per character in no hand
+        self.deck = [self.totals[c] for c in self.characters]
+        self.deck_hash = 0
+        for i, count in enumerate(self.deck):
+            self.deck_hash ^= self.deck_keys[i][count]
+        for seat in range(n):
+            self.rehash(seat)
+
+    def __call__(self, event):
+        handler = self.handlers.get(type(event))
+        if handler is not None:
+            handler(event)
+
+    def on_declared(self, event):
+        while self.dirty:  # the previous turn is over
+            self.rehash(self.dirty.pop())
+        self.dirty.add(self.seats[id(event.player)])
+        target = getattr(event.action, "target_player", None)
+        if target is not None:
+            self.dirty.add(self.seats[id(target)])
+
+    def on_challenged(self, event):
+        self.dirty.add(self.seats[id(event.challenger)])
+
+    def on_blocked(self, event):
+        self.dirty.add(self.seats[id(event.blocker)])
+
+    def contribution(self, rel, counts):
+        coins, hidden, revealed = counts
+        h = self.coin_keys[rel][coins]
+        hidden_keys = self.hidden_keys[rel]
+        revealed_keys = self.revealed_keys[rel]
+        for i in range(len(hidden)):
+            for k in range(hidden[i]):
+                h ^= hidden_keys[i][k]
+            for k in range(revealed[i]):
+                h ^= revealed_keys[i][k]
+        return h
+
+    def rehash(self, seat):
+        player = self.game.players[seat]
+        old = self.counts[seat]
+        check_coins(player.coins, self.coin_limit)
+        new = (player.coins, *hand_counts(player, self.characters))
+        if old == new:
+            return
+        n = len(self.hashes)
+        for rotation in range(n):
+            rel = (seat - rotation) % n
+            delta = self.contribution(rel, new)
+            if old is not None:
+                delta ^= self.contribution(rel, old)
+            self.hashes[rotation] ^= delta
+        for i in range(len(self.characters)):
+            moved = new[1][i] + new[2][i]
+            if old is not None:
+                moved -= old[1][i] + old[2][i]
+            if moved:
+                self.deck_hash ^= self.deck_keys[i][self.deck[i]]
+                self.deck[i] -= moved
+                self.deck_hash ^= self.deck_keys[i][self.deck[i]]
+        self.counts[seat] = new
+
+    def hash(self):
+        """Hash of the current position, equal for positions with the same canonical encoding."""
+        for seat in self.dirty:
+            self.rehash(seat)
+        return self.hashes[self.game.player_turn] ^ self.deck_hash
+
+    def close(self):
+        self.game.events.unsubscribe(self)
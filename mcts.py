@@ -0,0 +1,296 @@
+from entities import AIController_Random, BaseController
+from actions import BaseAction
+from utils import (
+    run_steps,
+    action_options,
+    target_options,
+    yes_no_options,
+    reveal_options,
+    exchange_options,
+)
+import math
+import time
+
+
+class Node:
+    """Visit and win counts of the options of one decision, and the nodes of the decisions following them."""
+
+    __slots__ = ("stats", "children")
+
+    def __init__(self):
+        self.stats = {}
+        self.children = {}
+
+    def child(self, key):
+        if key not in self.children:
+            self.children[key] = Node()
+        return self.children[key]
+
+    def select(self, keys, rng, exploration):
+        unvisited = [k for k in keys if k not in self.stats]
+        if unvisited:
+            return rng.choice(unvisited)
+        total = sum(self.stats[k][0] for k in keys)
+        return max(keys, key=lambda k: self.ucb(k, total, exploration))
+
+    def ucb(self, key, total, exploration):
+        visits, wins = self.stats[key]
+        return wins / visits + exploration * math.sqrt(math.log(total) / visits)
+
+    def best(self, keys):
+        return max(keys, key=lambda k: self.stats.get(k, (0, 0))[0])
+
+    def update(self, key, reward):
+        visits, wins = self.stats.get(key, (0, 0))
+        self.stats[key] = (visits + 1, wins + reward)
+
+
+class AIController_TreePolicy(AIController_Random):
+    """
+    Rollout controller of the searching player.
+    Its decisions within the searched turn follow the tree (UCB1), all later ones are random.
+    """
+
+    __slots__ = ("node", "turn", "exploration", "path")
+
+    def __init__(self, node, turn, exploration, rng=None):
+        super().__init__(rng=rng)
+        self.node = node
+        self.turn = turn
+        self.exploration = exploration
+        self.path = []  # (node, key) pairs of the decisions taken in the tree
+
+    def in_turn(self):
+        return (self.game.rounds_completed, self.game.player_turn) == self.turn
+
+    def decide(self, options):
+        key = self.node.select([k for k, o in options], self.rng, self.exploration)
+        self.path.append((self.node, key))
+        self.node = self.node.child(key)
+        return dict(options)[key]
+
+    def choose_action(self, action_types):
+        if not self.in_turn():
+            return super().choose_action(action_types)
+        return self.decide(action_options(self, action_types))
+
+    def choose_target(self, players):
+        if not self.in_turn():
+            return super().choose_target(players)
+        return self.decide(target_options(self.player, players))
+
+    def choose_reveal(self, influences):
+        if not self.in_turn():
+            return super().choose_reveal(influences)
+        return self.decide(reveal_options(influences))
+
+    def choose_exchange(self, cards, n):
+        if not self.in_turn():
+            return super().choose_exchange(cards, n)
+        return self.decide(exchange_options(cards, n))
+
+    def decide_challenge(self, action):
+        if not self.in_turn():
+            return super().decide_challenge(action)
+        return self.decide(yes_no_options())
+
+    def decide_block(self, action):
+        if not self.in_turn():
+            return super().decide_block(action)
+        return self.decide(yes_no_options())
+
+    def decide_challenge_block(self, action):
+        if not self.in_turn():
+            return super().decide_challenge_block(action)
+        return self.decide(yes_no_options())
+
+
+def determinize(game, seat, rng):
+    """Deals the cards unknown to the player at seat (other players' influences and the deck) at random."""
+    slots = [
+        (player, i)
+        for j, player in enumerate(game.players)
+        if j != seat
+        for i, character in enumerate(player.influences)
+        if not character.revealed
+    ]
+    pool = [type(p.influences[i]) for p, i in slots]
+    pool += [type(c) for c in game.deck.cards]
+    rng.shuffle(pool)
+    for (player, i), character_type in zip(slots, pool):
+        player.influences[i] = character_type(anonymous=True)
+    game.deck.cards = [c(anonymous=True) for c in pool[len(slots) :]]
+
+
+def transplant(action, game, clone):
+    """Copies an action of game into its clone, without paying for it again."""
+    copy = object.__new__(type(action))
+    for attr in BaseAction.__slots__:
+        if hasattr(action, attr):
+            value = getattr(action, attr)
+            if attr == "deck":
+                value = clone.deck
+            elif attr.endswith("player"):
+                value = clone.players[game.players.index(value)]
+            setattr(copy, attr, value)
+    return copy
+
+
+class AIController_MCTS(BaseController):
+    """
+    Monte Carlo Tree Search over the decisions of the current turn.
+    Every rollout plays a clone of the game to its end, after dealing the cards hidden from this player at random.
+    Other players are played by random AIs, the own decisions of the turn follow the tree and later ones are random.
+    A search stops after max_rollouts rollouts or time_budget seconds (if given), whichever comes first.
+    Statistics are kept for the whole turn, so later decisions of a turn reuse the rollouts of the earlier ones.
+    Rollouts for choose_reveal continue at the next turn, since a reveal can interrupt a turn at any point.
+    """
+
+    __slots__ = (
+        "time_budget",
+        "max_rollouts",
+        "exploration",
+        "turn",
+        "root",
+        "path",
+        "declared",
+    )
+
+    def __init__(
+        self, time_budget=0.05, max_rollouts=1000, exploration=1.4, rng=None
+    ):
+        super().__init__(rng=rng)
+        self.time_budget = time_budget
+        self.max_rollouts = max_rollouts
+        self.exploration = exploration
+        self.turn = None
+        self.root = None
+        self.path = []  # keys of the own decisions taken in the current turn
+        self.declared = None  # action type chosen in the current turn
+
+    @property
+    def seat(self):
+        return self.game.players.index(self.player)
+
+    def current_node(self):
+        turn = (self.game.rounds_completed, self.game.player_turn)
+        if turn != self.turn:  # new turn, drop the old tree
+            self.turn = turn
+            self.root = Node()
+            self.path = []
+        node = self.root
+        for key in self.path:
+            node = node.child(key)
+        return node
+
+    def search(self, options, apply):
+        """
+        Returns the best of the (key, option) pairs.
+        apply(clone, key) has to return the rule steps playing the option on a clone of the game,
+        up to the end of the current turn.
+        """
+        node = self.current_node()
+        keys = [k for k, o in options]
+        if len(keys) > 1:
+            start = time.perf_counter()
+            for i in range(self.max_rollouts):
+                if self.time_budget and time.perf_counter() - start > self.time_budget:
+                    break
+                self.rollout(node, keys, apply)
+        key = node.best(keys)
+        self.path.append(key)
+        return dict(options)[key]
+
+    def rollout(self, node, keys, apply):
+        key = node.select(keys, self.rng, self.exploration)
+        seat = self.seat
+        game = self.game.clone(rng=self.rng)
+        determinize(game, seat, self.rng)
+        policy = AIController_TreePolicy(
+            node.child(key), self.turn, self.exploration, rng=self.rng
+        )
+        for i, player in enumerate(game.players):
+            controller = policy if i == seat else AIController_Random(rng=self.rng)
+            player.connect_controller(controller)
+            controller.game = game
+        run_steps(apply(game, key))
+        game.run(first_seat=self.turn[1] + 1)  # returns at once if the game is over
+        reward = int(game.players[seat].is_alive())
+        node.update(key, reward)
+        for tree_node, tree_key in policy.path:
+            tree_node.update(tree_key, reward)
+
+    def choose_action(self, action_types):
+        def apply(game, key):
+            player = game.players[self.seat]
+            action = yield from game.declare_action(player, action_type=key)
+            yield from game.resolve_action(action)
+
+        self.declared = self.search(action_options(self, action_types), apply)
+        return self.declared
+
+    def choose_target(self, players):
+        def apply(game, key):
+            player = game.players[self.seat]
+            target = game.players[key]
+            action = yield from game.declare_action(player, self.declared, target)
+            yield from game.resolve_action(action)
+
+        return self.search(target_options(self.player, players), apply)
+
+    def decide_challenge(self, action):
+        def apply(game, key):
+            challenger = game.players[self.seat] if key else None
+            copy = transplant(action, self.game, game)
+            yield from game.resolve_action(copy, challenger=challenger)
+
+        return self.search(yes_no_options(), apply)
+
+    def decide_block(self, action):
+        def apply(game, key):
+            blocker = game.players[self.seat] if key else None
+            copy = transplant(action, self.game, game)
+            yield from game.resolve_action(copy, challenger=None, blocker=blocker)
+
+        return self.search(yes_no_options(), apply)
+
+    def decide_challenge_block(self, action):
+        def apply(game, key):
+            block_challenger = game.players[self.seat] if key else None
+            copy = transplant(action, self.game, game)
+            yield from game.resolve_action(
+                copy,
+                challenger=None,
+                blocker=copy.blocking_player,
+                block_challenger=block_challenger,
+            )
+
+        return self.search(yes_no_options(), apply)
+
+    def choose_reveal(self, influences):
+        def apply(game, key):
+            player = game.players[self.seat]
+            for character in player.get_unrevealed_influences():
+                if type(character) is key:
+                    player.reveal(character)
+                    break
+            yield from ()  # no decisions
+
+        return self.search(reveal_options(influences), apply)
+
+    def choose_exchange(self, cards, n):
+        options = exchange_options(cards, n)
+
+        def apply(game, key):
+            player = game.players[self.seat]
+            chosen = dict(options)[key]
+            for character in player.get_unrevealed_influences():
+                player.remove_card(character)
+            for character in chosen:
+                player.add_card(character.copy())
+            for character in cards:
+                if character not in chosen:
+                    game.deck.put_back(character.copy())
+            yield from ()  # no decisions
+
+        return self.search(options, apply)
@@ -0,0 +1,180 @@
+"""
+Optional instrumentation of games: latency histograms of the phases of turns and of controller decisions.
+
+Pass a Profile to Game (or to many games, it aggregates) to enable it:
+
+    profile = Profile()
+    Game(players, deck, profile=profile).run()
+    profile.write_textfile("putsch.prom")  # for the Prometheus node exporter's textfile collector
+
+Without a profile the games only check for it at every phase and decision.
+"""
+from bisect import bisect_left
+from itertools import accumulate
+from utils import write_atomic
+import json
+
+# upper bounds in seconds, as in Prometheus' le label
+BUCKETS = (
+    0.000005,
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+HELP = {
+    "phase_seconds": "Duration of the phases of turns, including the decisions taken in them.",
+    "decision_seconds": "Duration of controller decisions by controller class and method.",
+    "fallbacks_total": "Decisions taken by a fallback AI instead of an async controller.",
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile."""
+        rank = q * self.count
+        for bound, n in zip(BUCKETS + (float("inf"),), accumulate(self.counts)):
+            if n >= rank:
+                return bound
+
+    def to_dict(self):
+        bounds = [str(b) for b in BUCKETS] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(bounds, accumulate(self.counts))),
+        }
+
+
+class Profile:
+    """Histograms and counters by metric name and labels, shared by any number of games."""
+
+    def __init__(self):
+        self.histograms = {}  # (metric, labels) -> Histogram, labels are sorted (name, value) pairs
+        self.counters = {}  # (metric, labels) -> int
+
+    def observe(self, metric, seconds, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        self.histograms[key].observe(seconds)
+
+    def count(self, metric, n=1, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def observe_phase(self, phase, seconds):
+        self.observe("phase_seconds", seconds, phase=phase)
+
+    def observe_decision(self, decision, seconds):
+        controller = type(decision.player.controller).__name__
+        method = decision.name
+        self.observe("decision_seconds", seconds, controller=controller, method=method)
+
+    def snapshot(self):
+        """JSON-compatible dict of all metrics."""
+        snapshot = {}
+        for (metric, labels), histogram in sorted(self.histograms.items()):
+            entry = dict(labels)
+            entry.update(histogram.to_dict())
+            snapshot.setdefault(metric, []).append(entry)
+        for (metric, labels), value in sorted(self.counters.items()):
+            entry = dict(labels)
+            entry["value"] = value
+            snapshot.setdefault(metric, []).append(entry)
+        return snapshot
+
+    def to_prometheus(self, prefix="putsch"):
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        described = set()
+
+        def describe(metric, kind):
+            if metric not in described:
+                described.add(metric)
+                lines.append(f"# HELP {prefix}_{metric} {HELP.get(metric, metric)}")
+                lines.append(f"# TYPE {prefix}_{metric} {kind}")
+
+        for (metric, labels), histogram in sorted(self.histograms.items()):
+            describe(metric, "histogram")
+            name = f"{prefix}_{metric}"
+            bounds = [str(b) for b in BUCKETS] + ["+Inf"]
+            for bound, n in zip(bounds, accumulate(histogram.counts)):
+                bucket_labels = format_labels(labels + (("le", bound),))
+                lines.append(f"{name}_bucket{bucket_labels} {n}")
+            lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        for (metric, labels), value in sorted(self.counters.items()):
+            describe(metric, "counter")
+            lines.append(f"{prefix}_{metric}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path, prefix="putsch"):
+        write_atomic(path, self.to_prometheus(prefix))
+
+    def write_json(self, path):
+        write_atomic(path, json.dumps(self.snapshot(), indent=2))
+
+    def report(self):
+        """Human readable summary: count, mean and 99th percentile bucket per histogram."""
+        lines = []
+        for (metric, labels), histogram in sorted(self.histograms.items()):
+            label = ", ".join(str(v) for k, v in labels)
+            mean = histogram.sum / histogram.count
+            p99 = histogram.quantile(0.99)
+            lines.append(
+                f"{metric} {label}: {histogram.count}x, "
+                f"mean {mean * 1e6:.1f}µs, p99 <= {p99 * 1e6:.0f}µs"
+            )
+        return "\n".join(lines)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def main(n_games=1000, seed=0):
+    from simulation import setup_game
+    from entities import get_random_AI
+    import random
+
+    profile = Profile()
+    for i in range(n_games):
+        game = setup_game([get_random_AI] * 4, random.Random(f"{seed}/{i}"))
+        game.profile = profile
+        game.run()
+    print(profile.report())
+
+
+if __name__ == "__main__":
+    main()
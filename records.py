@@ -0,0 +1,271 @@
+"""
+Binary game records.
+
+A record consists of a header, the names of the game's action types and characters,
+the initial deck order (one byte per card, its index among the characters, before the cards were dealt)
+and one fixed-width entry per decision. Every entry is (kind, seat, value) packed into 4 bytes:
+
+ACTION           seat declares the action with index value in game.action_types
+TARGET           seat targets the player sitting at value
+CHALLENGE        seat challenges the current action
+BLOCK            seat blocks the current action
+BLOCK_CHALLENGE  seat challenges the current block
+REVEAL           seat reveals its unrevealed influence with index value
+EXCHANGE         seat keeps the exchange options marked in the bitmask value
+DECK             a card was put back into the deck at position value
+"""
+from characters import Ambassador, Assassin, Captain, Contessa, Duke
+from entities import Player, Deck, BaseController
+from actions import (
+    InterAction,
+    Income,
+    ForeignAid,
+    Tax,
+    Coup,
+    Assassinate,
+    Steal,
+    Exchange,
+)
+from events import (
+    ActionDeclared,
+    BlockChallenged,
+    Blocked,
+    CardReturned,
+    Challenged,
+    Exchanged,
+    InfluenceLost,
+)
+from game import Game
+from simulation import setup_game
+from utils import run_steps
+import struct
+
+MAGIC = b"PTSR"
+VERSION = 2  # 2: names of the action types and characters
+# magic, version, players, influences, coins, action types, characters, cards
+HEADER = struct.Struct("<4sBBBBBBH")
+ENTRY = struct.Struct("<BBH")
+ACTION, TARGET, CHALLENGE, BLOCK, BLOCK_CHALLENGE, REVEAL, EXCHANGE, DECK = range(8)
+# classes replay resolves names to, custom ones have to be passed to it
+CLASSES = [Income, ForeignAid, Tax, Coup, Assassinate, Steal, Exchange]
+CLASSES += [Ambassador, Assassin, Captain, Contessa, Duke]
+
+
+def encode_names(classes):
+    """Class names, each prefixed with its length in bytes."""
+    encoded = bytearray()
+    for cls in classes:
+        name = cls.__name__.encode()
+        encoded += bytes([len(name)]) + name
+    return bytes(encoded)
+
+
+def decode_names(record, start, n):
+    """Returns the n names encoded at start and the position after them."""
+    names = []
+    for i in range(n):
+        length = record[start]
+        names.append(record[start + 1 : start + 1 + length].decode())
+        start += 1 + length
+    return names, start
+
+
+def resolve(names, classes):
+    lookup = {cls.__name__: cls for cls in CLASSES}
+    lookup.update((cls.__name__, cls) for cls in classes)
+    try:
+        return [lookup[name] for name in names]
+    except KeyError as error:
+        raise ValueError(f"{error.args[0]} is unknown, pass its class to replay")
+
+
+class GameRecorder:
+    """
+    Event sink writing the binary record of a game.
+    Has to be created right after the Game, before any turn is played.
+    """
+
+    def __init__(self, game):
+        self.action_types = game.action_types
+        self.seats = {id(p): i for i, p in enumerate(game.players)}
+        characters = sorted(game.deck.characters, key=lambda c: c.__name__)
+        dealt = [type(c) for p in game.players for c in p.influences]
+        initial_deck = [type(c) for c in game.deck.cards] + dealt[::-1]
+        self.header = (
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(game.players),
+                game.n_influences,
+                game.players[0].coins,
+                len(self.action_types),
+                len(characters),
+                len(initial_deck),
+            )
+            + encode_names(self.action_types)
+            + encode_names(characters)
+            + bytes(characters.index(c) for c in initial_deck)
+        )
+        self.entries = bytearray()
+        game.events.subscribe(self)
+
+    def __call__(self, event):
+        t = type(event)
+        if t is ActionDeclared:
+            seat = self.seats[id(event.player)]
+            action_index = self.action_types.index(type(event.action))
+            self.write(ACTION, seat, action_index)
+            if isinstance(event.action, InterAction):
+                self.write(TARGET, seat, self.seats[id(event.action.target_player)])
+        elif t is Challenged:
+            self.write(CHALLENGE, self.seats[id(event.challenger)])
+        elif t is Blocked:
+            self.write(BLOCK, self.seats[id(event.blocker)])
+        elif t is BlockChallenged:
+            self.write(BLOCK_CHALLENGE, self.seats[id(event.challenger)])
+        elif t is InfluenceLost:
+            unrevealed = event.player.get_unrevealed_influences()
+            self.write(
+                REVEAL, self.seats[id(event.player)], unrevealed.index(event.character)
+            )
+        elif t is Exchanged:
+            mask = sum(1 << i for i, c in enumerate(event.options) if c in event.choices)
+            self.write(EXCHANGE, self.seats[id(event.player)], mask)
+        elif t is CardReturned:
+            self.write(DECK, 0, event.position)
+
+    def write(self, kind, seat, value=0):
+        self.entries += ENTRY.pack(kind, seat, value)
+
+    def to_bytes(self):
+        return self.header + bytes(self.entries)
+
+
+def record_game(player_factories, rng=None, deck_kwargs=None, **game_kwargs):
+    """Plays a single headless game (see simulation.setup_game) and returns its record."""
+    game = setup_game(player_factories, rng, deck_kwargs, **game_kwargs)
+    recorder = GameRecorder(game)
+    game.run()
+    return recorder.to_bytes()
+
+
+def decode(record, classes=()):
+    """
+    Splits a record into its header fields, action types, initial deck order and list of entries.
+    Names of action types and characters are resolved to the standard ones and the given classes.
+    """
+    magic, version, n_players, n_influences, coins, n_actions, n_characters, n_cards = (
+        HEADER.unpack_from(record)
+    )
+    assert magic == MAGIC, "Not a game record."
+    assert version == VERSION, f"Unsupported record version {version}."
+    action_names, start = decode_names(record, HEADER.size, n_actions)
+    character_names, start = decode_names(record, start, n_characters)
+    action_types = resolve(action_names, classes)
+    characters = resolve(character_names, classes)
+    deck = [characters[i] for i in record[start : start + n_cards]]
+    entries = list(ENTRY.iter_unpack(record[start + n_cards :]))
+    return (n_players, n_influences, coins), action_types, deck, entries
+
+
+class Script:
+    """
+    The decisions of a record in order of appearance.
+    Also stands in for the deck's random stream, so returned cards land where they did originally.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.entries):
+            return self.entries[self.position][0]
+        else:
+            return None
+
+    def next(self, kind):
+        entry = self.entries[self.position]
+        assert entry[0] == kind, f"Expected entry of kind {kind}, found {entry}."
+        self.position += 1
+        return entry
+
+    def randrange(self, n):
+        return self.next(DECK)[2]
+
+
+class ReplayController(BaseController):
+    __slots__ = ("script",)
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = script
+
+    def choose_reveal(self, influences):
+        return influences[self.script.next(REVEAL)[2]]
+
+    def choose_exchange(self, cards, n):
+        mask = self.script.next(EXCHANGE)[2]
+        return [c for i, c in enumerate(cards) if mask & (1 << i)]
+
+
+def replay(record, classes=()):
+    """
+    Rebuilds the final state of a recorded game by applying its decisions to a fresh Game.
+    No controller logic is executed, cards are anonymous.
+    Custom action types or characters of the recorded game have to be passed as classes.
+    """
+    (n_players, n_influences, coins), action_types, initial_deck, entries = decode(
+        record, classes
+    )
+    script = Script(entries)
+    deck = Deck(characters=set(initial_deck), anonymous=True)
+    deck.cards = [deck.new_card(c) for c in initial_deck]
+    deck.rng = script
+    players = [Player(ReplayController(script)) for i in range(n_players)]
+    game = Game(players, deck, n_influences, coins, action_types)
+    last_seat = None
+    interrupted = False
+    while script.peek() is not None:
+        kind, seat, value = script.next(ACTION)
+        if last_seat is not None and seat <= last_seat:
+            game.rounds_completed += 1
+        game.player_turn = last_seat = seat
+        interrupted = replay_turn(game, script, seat, game.action_types[value])
+    if last_seat == n_players - 1 and not interrupted:  # final round ran to its end
+        game.rounds_completed += 1
+    return game
+
+
+def replay_turn(game, script, seat, action_type):
+    """
+    Mirrors Game.run_turn with the decisions taken from the script.
+    Returns True if the game ended in the middle of the turn.
+    """
+    action_kwargs = {
+        "executing_player": game.players[seat],
+        "deck": game.deck,
+        "rules": game.rules,
+    }
+    if game.rules.targeted[action_type]:
+        action_kwargs["target_player"] = game.players[script.next(TARGET)[2]]
+    action = action_type(**action_kwargs)
+    game.actions.append(action)
+    if script.peek() == CHALLENGE:
+        challenger = game.players[script.next(CHALLENGE)[1]]
+        if run_steps(action.challenge(challenger)):
+            action.handled = True
+            return
+    if game.win_condition_met():
+        return True
+    if script.peek() == BLOCK:
+        action.block(game.players[script.next(BLOCK)[1]])
+        if script.peek() == BLOCK_CHALLENGE:
+            challenger = game.players[script.next(BLOCK_CHALLENGE)[1]]
+            if not run_steps(action.challenge_block(challenger)):
+                action.handled = True
+                return
+        else:
+            action.handled = True
+            return
+    run_steps(action.execute())
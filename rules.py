@@ -0,0 +1,55 @@
+from actions import Coup, BlockableAction, CharacterAction, InterAction
+
+
+class Rules:
+    """
+    Lookup tables of the rules, compiled once per game from its action types and characters.
+    affordable: per coin count the available action types, counts from forced_coup on have to Coup
+    claimants / blockers: per action type the character types that can perform / block it
+    targeted / challengeable / blockable: phase flags per action type
+    """
+
+    __slots__ = (
+        "action_types",
+        "forced_coup",
+        "affordable",
+        "claimants",
+        "blockers",
+        "targeted",
+        "challengeable",
+        "blockable",
+    )
+
+    def __init__(self, action_types, characters, forced_coup=10):
+        self.action_types = tuple(action_types)
+        self.forced_coup = forced_coup
+        self.affordable = [
+            tuple(a for a in action_types if a.cost <= coins)
+            for coins in range(forced_coup)
+        ]
+        self.affordable.append((Coup,))
+        # Coup is always part of the tables, since it is forced with enough coins
+        types = list(action_types) + [Coup]
+        self.claimants = {
+            a: frozenset(c for c in characters if a in c.actions) for a in types
+        }
+        self.blockers = {
+            a: frozenset(c for c in characters if a in c.blocks) for a in types
+        }
+        self.targeted = {a: issubclass(a, InterAction) for a in types}
+        self.challengeable = {a: issubclass(a, CharacterAction) for a in types}
+        self.blockable = {a: issubclass(a, BlockableAction) for a in types}
+
+    def available(self, coins):
+        return self.affordable[min(coins, self.forced_coup)]
+
+
+_compiled = {}
+
+
+def compile_rules(action_types, characters):
+    """Returns the Rules of the action types and characters, shared by all games using the same ones."""
+    key = (tuple(action_types), frozenset(characters))
+    if key not in _compiled:
+        _compiled[key] = Rules(action_types, characters)
+    return _compiled[key]
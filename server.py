@@ -0,0 +1,227 @@
+from entities import Player, Deck, BaseController
+from entities import AIController_Random, get_random_AI
+from game import Game
+from utils import decision_options
+import asyncio
+import json
+import random
+import time
+
+
+def label(key, option):
+    """Human readable name of a decision option."""
+    if isinstance(key, bool):
+        return "yes" if key else "no"
+    elif isinstance(key, type):
+        return key.__name__
+    elif isinstance(key, tuple):
+        return " and ".join(key)
+    else:
+        return str(option)
+
+
+class AsyncController(BaseController):
+    """
+    Base of controllers that answer decisions asynchronously, e.g. humans over the network.
+    A GameHost awaits answer for every decision, the default dispatches to coroutine methods
+    with the names of the synchronous ones (choose_action, decide_challenge, ...).
+    """
+
+    __slots__ = ()
+
+    async def answer(self, decision):
+        return await getattr(self, decision.name)(*decision.args)
+
+
+class RemoteController(AsyncController):
+    """
+    Asks a client to pick one of the options of each decision by index.
+    Prompts are numbered, answers to prompts that already timed out are dropped.
+    """
+
+    __slots__ = ("n_prompts",)
+
+    def __init__(self, rng=None):
+        super().__init__(rng=rng)
+        self.n_prompts = 0
+
+    async def answer(self, decision):
+        options = decision_options(decision)
+        self.n_prompts += 1
+        prompt = {
+            "id": self.n_prompts,
+            "decision": decision.name,
+            "options": [label(k, o) for k, o in options],
+        }
+        await self.send(prompt)
+        while True:
+            reply = await self.receive()
+            if not isinstance(reply, dict):
+                raise ValueError(f"Reply is not an object: {reply!r}")
+            if reply.get("id") == self.n_prompts:  # replies to older prompts are skipped
+                answer = reply.get("answer")
+                if type(answer) is not int or not 0 <= answer < len(options):
+                    raise ValueError(f"Invalid answer {answer!r} to {decision.name}")
+                return options[answer][1]
+
+    async def send(self, message):
+        raise NotImplementedError
+
+    async def receive(self):
+        raise NotImplementedError
+
+
+class QueueController(RemoteController):
+    """In-process stand-in for a remote client, messages are passed through two asyncio queues."""
+
+    __slots__ = ("prompts", "replies")
+
+    def __init__(self, rng=None):
+        super().__init__(rng=rng)
+        self.prompts = asyncio.Queue()
+        self.replies = asyncio.Queue()
+
+    async def send(self, message):
+        await self.prompts.put(message)
+
+    async def receive(self):
+        return await self.replies.get()
+
+
+class StreamController(RemoteController):
+    """Talks to a client over an asyncio stream (e.g. TCP), one JSON message per line."""
+
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader, writer, rng=None):
+        super().__init__(rng=rng)
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, message):
+        self.writer.write(json.dumps(message).encode() + b"\n")
+        await self.writer.drain()
+
+    async def receive(self):
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError(f"{self} disconnected.")
+        return json.loads(line)
+
+
+class GameHost:
+    """
+    Runs many games concurrently in one asyncio event loop.
+    Synchronous controllers are called directly, AsyncControllers are awaited for at most timeout seconds.
+    If they time out, disconnect or send garbage, an instance of fallback (an AI controller class) decides instead.
+    """
+
+    def __init__(
+        self, timeout=30.0, fallback=AIController_Random, yield_every=100, rng=None
+    ):
+        self.timeout = timeout
+        self.fallback = fallback
+        self.yield_every = yield_every  # sync decisions before other games get a turn
+        self.rng = rng or random.Random()
+
+    async def play(self, game):
+        n_sync = 0
+        profile = game.profile
+        decision = game.step()
+        while decision is not None:
+            start = time.perf_counter()
+            if isinstance(decision.player.controller, AsyncController):
+                answer = await self.ask(decision)
+            else:
+                answer = decision.ask()
+                n_sync += 1
+                if n_sync % self.yield_every == 0:
+                    await asyncio.sleep(0)
+            if profile is not None:
+                profile.observe_decision(decision, time.perf_counter() - start)
+            decision = game.step(answer)
+        return game
+
+    async def ask(self, decision):
+        controller = decision.player.controller
+        try:
+            return await asyncio.wait_for(controller.answer(decision), self.timeout)
+        except asyncio.TimeoutError:
+            return self.ask_fallback(decision, "timeout")
+        except ConnectionError:
+            return self.ask_fallback(decision, "disconnected")
+        except (LookupError, TypeError, ValueError):
+            return self.ask_fallback(decision, "invalid")
+
+    def ask_fallback(self, decision, reason):
+        profile = decision.player.controller.game.profile
+        if profile is not None:
+            profile.count("fallbacks_total", reason=reason)
+        controller = self.fallback(rng=self.rng)
+        controller.player = decision.player  # decides without taking over the player
+        controller.game = decision.player.controller.game
+        return getattr(controller, decision.name)(*decision.args)
+
+    async def play_all(self, games):
+        return await asyncio.gather(*(self.play(game) for game in games))
+
+    async def handle_connection(self, reader, writer, n_players=4):
+        """Seats a TCP client at a new table with AI opponents and plays one game."""
+        human = StreamController(reader, writer, rng=self.rng)
+        players = [Player(human, "Remote")]
+        players += [Player(get_random_AI(self.rng), i) for i in range(2, n_players + 1)]
+        game = Game(players, Deck(rng=self.rng), rng=self.rng)
+        await self.play(game)
+        try:
+            await human.send({"winner": str(game.get_alive_players()[0])})
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+async def random_client(host="127.0.0.1", port=8765, rng=None):
+    """Stand-in TCP client answering every prompt at random, returns the announced winner."""
+    rng = rng or random.Random()
+    reader, writer = await asyncio.open_connection(host, port)
+    while True:
+        message = json.loads(await reader.readline())
+        if "winner" in message:
+            writer.close()
+            return message["winner"]
+        reply = {"id": message["id"], "answer": rng.randrange(len(message["options"]))}
+        writer.write(json.dumps(reply).encode() + b"\n")
+        await writer.drain()
+
+
+async def queue_client(controller, rng=None):
+    """Stand-in in-process client of a QueueController answering every prompt at random."""
+    rng = rng or random.Random()
+    while True:
+        prompt = await controller.prompts.get()
+        answer = rng.randrange(len(prompt["options"]))
+        await controller.replies.put({"id": prompt["id"], "answer": answer})
+
+
+async def demo(n_games=200, seed=0):
+    """Plays n_games concurrently, each with one in-process remote player and three AIs."""
+    rng = random.Random(seed)
+    host = GameHost(timeout=1.0, rng=rng)
+    games, clients = [], []
+    for i in range(n_games):
+        remote = QueueController(rng=rng)
+        players = [Player(remote)] + [Player(get_random_AI(rng)) for i in range(3)]
+        games.append(Game(players, Deck(anonymous=True, rng=rng), rng=rng))
+        clients.append(asyncio.ensure_future(queue_client(remote, rng)))
+    await host.play_all(games)
+    for client in clients:
+        client.cancel()
+    return games
+
+
+if __name__ == "__main__":
+    asyncio.run(GameHost().serve())
@@ -0,0 +1,207 @@
+from collections import Counter
+from tournament import iter_results
+import math
+import time
+
+
+def wilson_interval(wins, n, z=1.96):
+    """Wilson score interval of a win rate, z=1.96 gives 95% confidence."""
+    if n == 0:
+        return 0.0, 1.0
+    p = wins / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class RunningMean:
+    """Running mean and variance in constant memory (Welford's algorithm)."""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def std(self):
+        if self.n < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.n - 1))
+
+
+class WinRateStats:
+    """
+    Streaming statistics of GameResults in constant memory, i.e. only counters per controller class,
+    seat and action type, and running means and variances (see RunningMean) of the game length in rounds
+    and of the turns played per controller class and per seat (a seat's turns are how long it stayed in).
+    Win rates of a controller class are per player, i.e. its wins divided by the seats it played.
+    """
+
+    def __init__(self, z=1.96):
+        self.z = z
+        self.n_games = 0
+        self.played = Counter()  # seats played per controller class
+        self.wins = Counter()  # wins per controller class
+        self.seat_wins = Counter()
+        self.actions = Counter()
+        self.controller_actions = {}  # per controller class a Counter of actions
+        self.seat_actions = {}  # per seat a Counter of actions
+        self.controller_turns = {}  # per controller class a RunningMean of turns per game
+        self.seat_turns = {}  # per seat a RunningMean of turns per game
+        self.n_seats = 0
+        self.rounds = RunningMean()
+
+    def update(self, result):
+        self.n_games += 1
+        self.played.update(result.lineup)
+        self.wins[result.controller] += 1
+        self.seat_wins[result.winner] += 1
+        self.actions.update(result.actions)
+        self.n_seats = max(self.n_seats, len(result.lineup))
+        self.rounds.update(result.rounds)
+        for seat, (controller, actions) in enumerate(
+            zip(result.lineup, result.seat_actions)
+        ):
+            turns = sum(actions.values())
+            if controller not in self.controller_actions:
+                self.controller_actions[controller] = Counter()
+                self.controller_turns[controller] = RunningMean()
+            if seat not in self.seat_actions:
+                self.seat_actions[seat] = Counter()
+                self.seat_turns[seat] = RunningMean()
+            self.controller_actions[controller].update(actions)
+            self.seat_actions[seat].update(actions)
+            self.controller_turns[controller].update(turns)
+            self.seat_turns[seat].update(turns)
+
+    def __call__(self, results):
+        for result in results:
+            self.update(result)
+
+    @property
+    def mean_rounds(self):
+        return self.rounds.mean
+
+    def std_rounds(self):
+        return self.rounds.std()
+
+    def win_rate(self, controller):
+        return self.wins[controller] / max(self.played[controller], 1)
+
+    def interval(self, controller):
+        return wilson_interval(self.wins[controller], self.played[controller], self.z)
+
+    def seat_interval(self, seat):
+        return wilson_interval(self.seat_wins[seat], self.n_games, self.z)
+
+    def action_mix(self, controller=None, seat=None):
+        """Shares of the action types, of all players or of a controller class or seat."""
+        if controller is not None:
+            actions = self.controller_actions.get(controller, Counter())
+        elif seat is not None:
+            actions = self.seat_actions.get(seat, Counter())
+        else:
+            actions = self.actions
+        total = sum(actions.values()) or 1
+        return {a: n / total for a, n in actions.most_common()}
+
+    def ranking(self):
+        """Controller classes from highest to lowest win rate."""
+        return sorted(self.played, key=self.win_rate, reverse=True)
+
+    def settled(self):
+        """True once the intervals of all neighbours in the ranking are disjoint."""
+        ranking = self.ranking()
+        for better, worse in zip(ranking, ranking[1:]):
+            if self.interval(better)[0] <= self.interval(worse)[1]:
+                return False
+        return len(ranking) > 0
+
+    def report(self):
+        lines = [
+            f"{self.n_games} games, {self.mean_rounds:.2f} ± {self.std_rounds():.2f} rounds"
+        ]
+        for controller in self.ranking():
+            low, high = self.interval(controller)
+            rate = self.win_rate(controller)
+            turns = self.controller_turns[controller]
+            lines.append(
+                f"{controller}: {rate:.3f} [{low:.3f}, {high:.3f}], "
+                f"{turns.mean:.2f} ± {turns.std():.2f} turns"
+            )
+        for seat in range(self.n_seats):
+            low, high = self.seat_interval(seat)
+            rate = self.seat_wins[seat] / max(self.n_games, 1)
+            turns = self.seat_turns.get(seat, RunningMean())
+            lines.append(
+                f"seat {seat}: {rate:.3f} [{low:.3f}, {high:.3f}], "
+                f"{turns.mean:.2f} ± {turns.std():.2f} turns"
+            )
+        mix = ", ".join(f"{a} {share:.2f}" for a, share in self.action_mix().items())
+        lines.append(f"actions: {mix}")
+        return "\n".join(lines)
+
+
+def play_until_settled(
+    player_factories,
+    max_games=1000000,
+    min_games=1000,
+    check_every=1000,
+    z=3.0,
+    stats=None,
+    on_check=None,
+    **tournament_kwargs,
+):
+    """
+    Plays a tournament (see tournament.iter_results) until the ranking of the controller classes is settled,
+    and returns the WinRateStats.
+    The ranking is checked every check_every games, on_check(stats) is called at every check, e.g. for live reports.
+    Since the check is repeated, the default z=3.0 is stricter than the usual 95% to keep false stops rare.
+    """
+    stats = stats or WinRateStats(z=z)
+    results = iter_results(max_games, player_factories, **tournament_kwargs)
+    try:
+        for result in results:
+            stats.update(result)
+            if stats.n_games % check_every == 0:
+                if on_check is not None:
+                    on_check(stats)
+                if stats.n_games >= min_games and stats.settled():
+                    break
+    finally:
+        results.close()  # cancels the remaining chunks
+    return stats
+
+
+def main(seed=0):
+    from entities import (
+        AIController_Random,
+        AIController_Defensive,
+        AIController_Offensive,
+        AIController_Skeptic,
+    )
+
+    lineup = [
+        AIController_Random,
+        AIController_Defensive,
+        AIController_Offensive,
+        AIController_Skeptic,
+    ]
+    start = time.perf_counter()
+    stats = play_until_settled(
+        lineup, seed=seed, on_check=lambda s: print(s.report(), end="\n\n")
+    )
+    duration = time.perf_counter() - start
+    print(f"ranking settled after {stats.n_games} games in {duration:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
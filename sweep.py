@@ -0,0 +1,183 @@
+"""
+Parameter sweeps over rules variants and controller line-ups.
+
+Every cell of a sweep (a line-up with one variant) is played as a headless batch on a process pool
+and summarized as stats.WinRateStats. Summaries are cached on disk under a content hash of the
+cell's configuration and of the source code of the engine and of the line-up's controllers, so re-running an overlapping grid only
+plays the cells that are new or whose rules changed.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from itertools import product
+from simulation import simulate
+from stats import WinRateStats
+from utils import write_atomic
+import hashlib
+import json
+import os
+import pickle
+import sys
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(DIRECTORY, ".sweep_cache")
+ENGINE_MODULES = [
+    "actions",
+    "characters",
+    "entities",
+    "events",
+    "game",
+    "rules",
+    "simulation",
+    "stats",  # WinRateStats are what is cached
+    "utils",
+]
+DECK_PARAMETERS = {"characters", "multiplicity"}  # the others are passed on to Game
+
+_code_versions = {}
+
+
+def code_version(modules=()):
+    """
+    Hash of the source files of the engine and of the given modules (e.g. the ones defining the controllers),
+    cached results of other versions are ignored.
+    """
+    modules = tuple(sorted(set(ENGINE_MODULES) | set(modules)))
+    if modules not in _code_versions:
+        digest = hashlib.sha256()
+        for name in modules:
+            path = getattr(sys.modules.get(name), "__file__", None)
+            if path is None:  # not imported yet, or built-in
+                path = os.path.join(DIRECTORY, f"{name}.py")
+            if os.path.exists(path):
+                digest.update(name.encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+        _code_versions[modules] = digest.hexdigest()
+    return _code_versions[modules]
+
+
+def describe(value):
+    """JSON-compatible, canonical description of a parameter value."""
+    if isinstance(value, (set, frozenset)):  # e.g. characters, order does not matter
+        return sorted(describe(v) for v in value)
+    elif isinstance(value, (list, tuple)):  # e.g. action_types, order matters
+        return [describe(v) for v in value]
+    elif isinstance(value, dict):
+        return {str(k): describe(v) for k, v in value.items()}
+    elif isinstance(value, partial):  # configured factories, e.g. of AIController_MCTS
+        return {
+            "partial": describe(value.func),
+            "args": describe(value.args),
+            "keywords": describe(value.keywords),
+        }
+    elif callable(value):  # classes and factory functions
+        return f"{value.__module__}.{value.__qualname__}"
+    else:
+        return value
+
+
+def modules_of(value):
+    """Names of the modules defining the callables in a parameter value."""
+    if isinstance(value, (set, frozenset, list, tuple)):
+        return set().union(*(modules_of(v) for v in value))
+    elif isinstance(value, dict):
+        return modules_of(list(value.values()))
+    elif isinstance(value, partial):
+        return modules_of([value.func, value.args, value.keywords])
+    elif callable(value):
+        return {value.__module__}
+    else:
+        return set()
+
+
+def cell_key(lineup, variant, n_games, seed):
+    config = {
+        "lineup": describe(lineup),
+        "variant": {k: describe(v) for k, v in variant.items()},
+        "n_games": n_games,
+        "seed": seed,
+        "code": code_version(modules_of([lineup, variant])),
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def grid(**axes):
+    """Yields the variants (dicts of parameters) of the cartesian product of the axes' values."""
+    names = list(axes)
+    for values in product(*(axes[n] for n in names)):
+        yield dict(zip(names, values))
+
+
+def play_cell(lineup, variant, n_games, seed):
+    deck_kwargs = {k: v for k, v in variant.items() if k in DECK_PARAMETERS}
+    game_kwargs = {k: v for k, v in variant.items() if k not in DECK_PARAMETERS}
+    stats = WinRateStats()
+    stats(simulate(n_games, lineup, seed, deck_kwargs=deck_kwargs, **game_kwargs))
+    return stats
+
+
+class ResultCache:
+    """WinRateStats pickled to one file per cell key."""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, key):
+        try:
+            with open(self.path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, stats):
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self.path(key), pickle.dumps(stats))  # readers never see partial files
+
+
+def sweep(lineups, variants, n_games=1000, seed=0, workers=None, cache=None):
+    """
+    Plays n_games games for every combination of line-up and variant and returns a list of
+    (lineup, variant, WinRateStats) in the order of the combinations.
+    lineups: lists of player factories (see simulation.setup_game), picklable
+    variants: dicts of Game and Deck keyword arguments, e.g. from grid(starting_coins=[1, 2, 3])
+    Cells found in the cache are not played again, pass cache=False to disable it.
+    """
+    cache = ResultCache() if cache is None else cache
+    variants = list(variants)  # e.g. a grid generator, iterated once per line-up
+    cells = [(lineup, variant) for lineup in lineups for variant in variants]
+    keys = [cell_key(lineup, variant, n_games, seed) for lineup, variant in cells]
+    results = [cache.get(key) if cache else None for key in keys]
+    missing = [i for i, stats in enumerate(results) if stats is None]
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(play_cell, *cells[i], n_games, seed): i
+                for i in missing
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                if cache:
+                    cache.put(keys[i], results[i])
+    return [(lineup, variant, stats) for (lineup, variant), stats in zip(cells, results)]
+
+
+def main(n_games=2000):
+    from entities import AIController_Random, AIController_Skeptic, get_random_AI
+    import time
+
+    lineups = [[AIController_Random] * 4, [AIController_Skeptic] + [get_random_AI] * 3]
+    variants = list(grid(starting_coins=[1, 2, 3], multiplicity=[3, 4]))
+    for attempt in ["first", "cached"]:
+        start = time.perf_counter()
+        cells = sweep(lineups, variants, n_games)
+        print(f"{attempt} run: {time.perf_counter() - start:.2f}s")
+    for lineup, variant, stats in cells:
+        print(describe(lineup)[0], variant, f"seat 0 wins {stats.seat_wins[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+from checkpoint import load_checkpoint, run_resumable
+from entities import get_random_AI
+from stats import RunningMean, WinRateStats
+import pytest
+
+LINEUP = [get_random_AI] * 4
+
+
+def fields(value):
+    """Comparable contents of WinRateStats, including their RunningMeans."""
+    if isinstance(value, RunningMean):
+        return (value.n, value.mean, value.m2)
+    elif isinstance(value, dict):
+        return {k: fields(v) for k, v in value.items()}
+    elif isinstance(value, WinRateStats):
+        return fields(vars(value))
+    else:
+        return value
+
+
+def play(path, **kwargs):
+    return run_resumable(
+        100, LINEUP, str(path), seed=3, checkpoint_every=30, workers=1, **kwargs
+    )
+
+
+def interrupt(state):
+    raise KeyboardInterrupt
+
+
+def test_resumed_run_equals_uninterrupted_run(tmp_path):
+    expected = play(tmp_path / "full")
+    path = tmp_path / "resumed"
+    with pytest.raises(KeyboardInterrupt):
+        play(path, on_checkpoint=interrupt)
+    assert load_checkpoint(path)["completed"] == 30
+    assert fields(play(path)) == fields(expected)
+
+
+def test_interruption_mid_update(tmp_path, monkeypatch):
+    expected = play(tmp_path / "full")
+    path = tmp_path / "resumed"
+    update = WinRateStats.update
+
+    def interrupted_update(self, result):
+        if self.n_games == 42:
+            self.n_games += 1  # half of an update
+            raise KeyboardInterrupt
+        update(self, result)
+
+    monkeypatch.setattr(WinRateStats, "update", interrupted_update)
+    with pytest.raises(KeyboardInterrupt):
+        play(path)
+    monkeypatch.setattr(WinRateStats, "update", update)
+    assert load_checkpoint(path)["completed"] == 30  # the last consistent state
+    assert fields(play(path)) == fields(expected)
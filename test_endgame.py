@@ -0,0 +1,22 @@
+from actions import Income, Coup, Steal
+from characters import Captain, Contessa, Duke
+from endgame import AIController_Endgame, EndgameSolver
+from entities import get_random_AI
+from rules import compile_rules
+from simulation import simulate
+
+LINEUP = [AIController_Endgame] + [get_random_AI] * 3
+
+
+def test_reduced_action_set():
+    results = simulate(5, LINEUP, seed=1, action_types=[Income, Coup, Steal])
+    assert len(results) == 5
+    solver = EndgameSolver(compile_rules([Income, Coup, Steal], {Captain, Duke}))
+    assert set(solver.claimants) == {Steal}
+    assert solver.blockers == {Steal: frozenset({"Captain"})}
+    assert solver.value(7, ("Duke",), 0, ("Duke",)) == 1  # Coup wins at once
+
+
+def test_reduced_characters():
+    deck_kwargs = {"characters": {Captain, Contessa, Duke}, "multiplicity": 4}
+    assert len(simulate(5, LINEUP, seed=2, deck_kwargs=deck_kwargs)) == 5
@@ -0,0 +1,54 @@
+from entities import Player, Deck, get_random_AI
+from game import Game
+from mcts import AIController_MCTS
+from simulation import setup_game
+from utils import RandomNameGenerator
+import random
+
+
+def named_game(controllers, rng):
+    players = [Player(c, name=f"Player {i}") for i, c in enumerate(controllers)]
+    return Game(players, Deck(rng=rng), rng=rng)
+
+
+def test_lookahead_draws_no_names():
+    rng = random.Random(0)
+    mcts = AIController_MCTS(time_budget=None, max_rollouts=200, rng=rng)
+    game = named_game([mcts] + [get_random_AI(rng=rng) for i in range(3)], rng)
+    drawn = RandomNameGenerator.n_drawn
+    clone = game.clone()
+    assert clone.deck.anonymous
+    mcts.choose_action(game.action_types)  # rolls out clones to their end
+    assert RandomNameGenerator.n_drawn == drawn
+
+
+def step_to_turn(game, seat):
+    """Steps the game to the start of the turn of seat."""
+    decision = game.step()
+    while not (decision.name == "choose_action" and game.player_turn == seat):
+        decision = game.step(decision.ask())
+    return decision
+
+
+def test_restore_discards_the_stepped_process():
+    rng = random.Random(0)
+    restored = setup_game([get_random_AI] * 4, rng)
+    step_to_turn(restored, 2)
+    state = restored.snapshot()
+    decision = restored.step(restored.pending.ask())
+    for i in range(12):
+        decision = restored.step(decision.ask())
+    restored.restore(state)
+    rng.seed(1)
+    restored.run()
+
+    rng = random.Random(0)
+    expected = setup_game([get_random_AI] * 4, rng)
+    step_to_turn(expected, 2)
+    expected.restore(expected.snapshot())
+    rng.seed(1)
+    expected.run()
+
+    assert restored.actions[state.n_actions].executing_player is restored.players[2]
+    assert restored.snapshot() == expected.snapshot()
+    assert [type(a) for a in restored.actions] == [type(a) for a in expected.actions]
@@ -0,0 +1,47 @@
+from actions import Income, Coup, Steal
+from characters import BaseCharacter, Captain, Contessa, Duke
+from entities import get_random_AI
+from records import GameRecorder, record_game, replay
+from simulation import setup_game, game_rng
+import pytest
+
+LINEUP = [get_random_AI] * 4
+
+
+class Jester(BaseCharacter):
+    __slots__ = ()
+    actions = BaseCharacter.actions | {Steal}
+
+
+def play_recorded(seed, i, deck_kwargs=None, **game_kwargs):
+    game = setup_game(LINEUP, game_rng(seed, i), deck_kwargs, **game_kwargs)
+    recorder = GameRecorder(game)
+    game.run()
+    return game, recorder.to_bytes()
+
+
+def test_replay_equals_played_game():
+    for i in range(50):
+        game, record = play_recorded(0, i)
+        assert replay(record).snapshot() == game.snapshot()
+
+
+def test_replay_of_a_variant():
+    for i in range(20):
+        game, record = play_recorded(1, i, action_types=[Income, Coup, Steal])
+        replayed = replay(record)
+        assert replayed.action_types == game.action_types
+        assert replayed.snapshot() == game.snapshot()
+
+
+def test_replay_of_custom_characters():
+    deck_kwargs = {"characters": {Captain, Contessa, Duke, Jester}}
+    for i in range(20):
+        game, record = play_recorded(2, i, deck_kwargs)
+        assert replay(record, classes=[Jester]).snapshot() == game.snapshot()
+    with pytest.raises(ValueError):
+        replay(record)
+
+
+def test_record_game_is_reproducible():
+    assert record_game(LINEUP, game_rng(3, 0)) == record_game(LINEUP, game_rng(3, 0))
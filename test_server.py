@@ -0,0 +1,74 @@
+from entities import Player, Deck, get_random_AI
+from game import Game
+from profiling import Profile
+from server import GameHost, RemoteController
+import asyncio
+import random
+
+
+class ScriptedController(RemoteController):
+    """Replies to every prompt with reply(prompt), which may also raise or hang."""
+
+    __slots__ = ("reply", "prompt")
+
+    def __init__(self, reply, rng=None):
+        super().__init__(rng=rng)
+        self.reply = reply
+        self.prompt = None
+
+    async def send(self, message):
+        self.prompt = message
+
+    async def receive(self):
+        return await self.reply(self.prompt)
+
+
+async def valid(prompt):
+    return {"id": prompt["id"], "answer": len(prompt["options"]) - 1}
+
+
+async def hang(prompt):
+    await asyncio.sleep(1)
+
+
+async def disconnect(prompt):
+    raise ConnectionError("client left")
+
+
+async def out_of_range(prompt):
+    return {"id": prompt["id"], "answer": len(prompt["options"])}
+
+
+async def not_an_int(prompt):
+    return {"id": prompt["id"], "answer": "0"}
+
+
+async def not_an_object(prompt):
+    return [prompt["id"], 0]
+
+
+def fallbacks(reply, timeout=1.0):
+    """Plays a game with one scripted remote player, returns the fallbacks counted by reason."""
+    rng = random.Random(0)
+    profile = Profile()
+    players = [Player(ScriptedController(reply, rng=rng))]
+    players += [Player(get_random_AI(rng)) for i in range(3)]
+    game = Game(players, Deck(anonymous=True, rng=rng), rng=rng, profile=profile)
+    asyncio.run(GameHost(timeout=timeout, rng=rng).play(game))
+    assert game.win_condition_met()
+    return {
+        dict(labels)["reason"]: n
+        for (metric, labels), n in profile.counters.items()
+        if metric == "fallbacks_total"
+    }
+
+
+def test_valid_replies_need_no_fallback():
+    assert fallbacks(valid) == {}
+
+
+def test_fallback_reasons():
+    assert fallbacks(hang, timeout=0.001).keys() == {"timeout"}
+    assert fallbacks(disconnect).keys() == {"disconnected"}
+    for reply in (out_of_range, not_an_int, not_an_object):
+        assert fallbacks(reply).keys() == {"invalid"}
@@ -0,0 +1,55 @@
+from entities import get_random_AI
+from sweep import ResultCache, grid, sweep
+import importlib
+import sweep as sweep_module
+import sys
+
+LINEUP = [get_random_AI] * 4
+
+
+class CountingCache(ResultCache):
+    """ResultCache counting the cells that were played and stored."""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.n_puts = 0
+
+    def put(self, key, stats):
+        self.n_puts += 1
+        super().put(key, stats)
+
+
+def test_cached_cells_are_not_played_again(tmp_path):
+    cache = CountingCache(tmp_path)
+    first = sweep([LINEUP], grid(starting_coins=[1, 2]), 20, workers=1, cache=cache)
+    assert cache.n_puts == 2
+    again = sweep([LINEUP], grid(starting_coins=[1, 2]), 20, workers=1, cache=cache)
+    assert cache.n_puts == 2
+    assert [c[2].seat_wins for c in again] == [c[2].seat_wins for c in first]
+    sweep([LINEUP], grid(starting_coins=[2, 3]), 20, workers=1, cache=cache)
+    assert cache.n_puts == 3  # only the new variant
+
+
+def test_changed_controller_code_is_played_again(tmp_path, monkeypatch):
+    source = tmp_path / "custom_ai.py"
+    code = (
+        "from entities import AIController_Random\n\n\n"
+        "class Custom(AIController_Random):\n"
+        "    __slots__ = ()\n"
+    )
+    source.write_text(code)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import custom_ai
+
+    cache = CountingCache(tmp_path / "cache")
+    lineup = [custom_ai.Custom] + [get_random_AI] * 3
+    sweep([lineup], [{}], 20, workers=1, cache=cache)
+    sweep([lineup], [{}], 20, workers=1, cache=cache)
+    assert cache.n_puts == 1
+    source.write_text(code + "    # tuned\n")  # same description, other code
+    monkeypatch.setattr(sweep_module, "_code_versions", {})  # a new process
+    importlib.reload(custom_ai)
+    lineup = [custom_ai.Custom] + [get_random_AI] * 3
+    sweep([lineup], [{}], 20, workers=1, cache=cache)
+    assert cache.n_puts == 2
+    del sys.modules["custom_ai"]
@@ -0,0 +1,18 @@
+from entities import get_random_AI
+from simulation import simulate
+from tournament import iter_results, run_tournament
+
+LINEUP = [get_random_AI] * 4
+
+
+def test_same_seed_same_results_for_any_worker_count():
+    expected = simulate(60, LINEUP, seed=7)
+    for workers in (1, 2):
+        results = run_tournament(60, LINEUP, seed=7, workers=workers, chunk_size=25)
+        assert results == expected
+
+
+def test_first_game_skips_the_games_before_it():
+    expected = simulate(60, LINEUP, seed=7)
+    results = iter_results(60, LINEUP, seed=7, workers=2, chunk_size=25, first_game=35)
+    assert list(results) == expected[35:]
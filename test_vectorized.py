@@ -0,0 +1,14 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vectorized import POLICIES, cross_check
+
+CHI2_DOF4_P001 = 18.47  # 99.9% quantile of the chi-squared distribution with 4 dof
+
+
+def test_cross_check_matches_the_object_engine():
+    controllers = list(POLICIES)  # one per seat, 5 seats
+    vectorized, objects, chi2 = cross_check(controllers, n_games=3000, seed=0)
+    assert sum(vectorized) == pytest.approx(1) and sum(objects) == pytest.approx(1)
+    assert chi2 < CHI2_DOF4_P001
@@ -0,0 +1,97 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from simulation import simulate
+import os
+import time
+
+
+def split_games(n_games, chunk_size, first_game=0):
+    """Yields (first_game, n_games) pairs covering range(first_game, n_games) in chunks."""
+    for start in range(first_game, n_games, chunk_size):
+        yield start, min(chunk_size, n_games - start)
+
+
+def run_tournament(
+    n_games,
+    player_factories,
+    seed=0,
+    workers=None,
+    chunk_size=500,
+    deck_kwargs=None,
+    **game_kwargs,
+):
+    """
+    Plays n_games headless games spread over a pool of worker processes and returns their GameResults in game order.
+    Each game draws from its own stream (see simulation.game_rng), so the same seed gives the same results for any number of workers.
+    player_factories have to be picklable, i.e. controller classes or module level functions like get_random_AI.
+    """
+    return list(
+        iter_results(
+            n_games,
+            player_factories,
+            seed,
+            workers,
+            chunk_size,
+            deck_kwargs,
+            **game_kwargs,
+        )
+    )
+
+
+def iter_results(
+    n_games,
+    player_factories,
+    seed=0,
+    workers=None,
+    chunk_size=500,
+    deck_kwargs=None,
+    first_game=0,
+    **game_kwargs,
+):
+    """
+    Like run_tournament, but yields the GameResults in game order as soon as their chunk is done.
+    Closing the generator early (e.g. breaking out of a loop over it) cancels the chunks that did not start yet.
+    Starting at first_game skips the games before it, e.g. to resume an interrupted tournament.
+    """
+    workers = workers or os.cpu_count()
+    chunks = split_games(n_games, chunk_size, first_game)
+    if workers == 1:
+        for first_game, n in chunks:
+            yield from simulate(
+                n, player_factories, seed, first_game, deck_kwargs, **game_kwargs
+            )
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                simulate,
+                n,
+                player_factories,
+                seed,
+                first_game,
+                deck_kwargs,
+                **game_kwargs,
+            )
+            for first_game, n in chunks
+        ]
+        try:
+            for future in futures:  # keep the game order
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def main(n_games=100000, seed=0):
+    from entities import get_random_AI
+
+    start = time.perf_counter()
+    results = run_tournament(n_games, [get_random_AI] * 4, seed=seed)
+    duration = time.perf_counter() - start
+    print(f"{n_games} games in {duration:.2f}s ({n_games / duration:.0f} games/s)")
+    for controller, wins in Counter(r.controller for r in results).most_common():
+        print(f"{controller}: {wins}")
+
+
+if __name__ == "__main__":
+    main()
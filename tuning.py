@@ -0,0 +1,212 @@
+"""
+Evolutionary tuning of parameterized AI controllers.
+
+AIController_Parameterized takes its behaviour from a parameter vector (see PARAMETERS), so strong
+opponents can be searched for instead of hand-written: evolve() evaluates every generation's
+population on a process pool. All candidates of a generation play the same games, i.e. the same
+seeded deals against the same opponents from the same seats (common random numbers), so the
+differences in their fitness come from the parameters rather than from the luck of the draw.
+"""
+from entities import AIController_Random, get_random_AI
+from simulation import game_rng, play_game
+from tournament import split_games
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from math import exp
+import os
+import random
+
+# name, lower bound, upper bound
+PARAMETERS = [
+    ("challenge", 0.0, 1.0),  # probability to challenge an action
+    ("block", 0.0, 1.0),  # probability to block an action
+    ("challenge_block", 0.0, 1.0),  # probability to challenge a block
+    ("aggression", 0.0, 1.0),  # probability to prefer targeted actions
+    ("target_influence", -3.0, 3.0),  # target weight of unrevealed influences
+    ("target_coins", -3.0, 3.0),  # target weight of coins
+]
+# the behaviour of AIController_Random
+DEFAULT_PARAMETERS = (0.5, 0.5, 0.5, 0.5, 0.0, 0.0)
+
+
+class AIController_Parameterized(AIController_Random):
+    """
+    Challenges, blocks and challenges blocks with fixed probabilities, prefers targeted actions with probability aggression
+    and targets competitors with probabilities proportional to exp(target_influence * influences + target_coins * coins).
+    """
+
+    __slots__ = ("params",)
+
+    def __init__(self, params=DEFAULT_PARAMETERS, rng=None):
+        super().__init__(rng=rng)
+        self.params = tuple(params)
+
+    def choose_action(self, action_types):
+        options = self.get_available_actions(action_types)
+        targeted = self.game.rules.targeted
+        aggressive = [o for o in options if targeted[o]]
+        peaceful = [o for o in options if not targeted[o]]
+        if aggressive and peaceful:
+            options = aggressive if self.rng.random() < self.params[3] else peaceful
+        return self.rng.choice(options)
+
+    def choose_target(self, players):
+        competitors = self.game.alive_players.excluding(self.player)
+        w_influence, w_coins = self.params[4], self.params[5]
+        weights = [
+            exp(w_influence * c.n_unrevealed + w_coins * c.coins) for c in competitors
+        ]
+        return self.rng.choices(competitors, weights)[0]
+
+    def decide_challenge(self, action):
+        return self.rng.random() < self.params[0]
+
+    def decide_block(self, action):
+        return self.rng.random() < self.params[1]
+
+    def decide_challenge_block(self, action):
+        return self.rng.random() < self.params[2]
+
+
+def clip(params):
+    return tuple(
+        min(max(p, low), high) for p, (name, low, high) in zip(params, PARAMETERS)
+    )
+
+
+def mutate(params, sigma, rng):
+    """Gaussian mutation, sigma is relative to the range of each parameter."""
+    return clip(
+        p + rng.gauss(0, sigma * (high - low))
+        for p, (name, low, high) in zip(params, PARAMETERS)
+    )
+
+
+def play_games(params, opponents, n_games, seed, first_game=0, **game_kwargs):
+    """
+    Plays games of the candidate against the opponent factories and returns its number of wins.
+    The candidate's seat rotates with the game index, all else is determined by seed and index.
+    """
+    candidate = partial(AIController_Parameterized, params)
+    n_players = len(opponents) + 1
+    wins = 0
+    for i in range(first_game, first_game + n_games):
+        seat = i % n_players
+        lineup = list(opponents)
+        lineup.insert(seat, candidate)
+        result = play_game(lineup, rng=game_rng(seed, i), **game_kwargs)
+        wins += result.winner == seat
+    return wins
+
+
+def evaluate(
+    population,
+    opponents,
+    n_games,
+    seed,
+    workers=None,
+    chunk_size=250,
+    **game_kwargs,
+):
+    """Win rates of the candidates, which all play the same n_games games. Spread over a process pool."""
+    workers = workers or os.cpu_count()
+    tasks = [
+        (c, first_game, n)
+        for c in range(len(population))
+        for first_game, n in split_games(n_games, chunk_size)
+    ]
+    wins = [0] * len(population)
+    if workers == 1:
+        for c, first_game, n in tasks:
+            wins[c] += play_games(
+                population[c], opponents, n, seed, first_game, **game_kwargs
+            )
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                (
+                    c,
+                    executor.submit(
+                        play_games,
+                        population[c],
+                        opponents,
+                        n,
+                        seed,
+                        first_game,
+                        **game_kwargs,
+                    ),
+                )
+                for c, first_game, n in tasks
+            ]
+            for c, future in futures:
+                wins[c] += future.result()
+    return [w / n_games for w in wins]
+
+
+def evolve(
+    opponents=(get_random_AI,) * 3,
+    generations=20,
+    population_size=16,
+    elite=4,
+    sigma=0.1,
+    n_games=1000,
+    seed=0,
+    workers=None,
+    on_generation=None,
+    **game_kwargs,
+):
+    """
+    Elitist evolution strategy: each generation keeps the elite best candidates and fills the population with mutations of them.
+    Every generation plays its own games (seeded by seed and generation), shared by all of its candidates.
+    opponents have to be picklable factories, e.g. controller classes or get_random_AI.
+    on_generation(generation, population, fitness) is called after each evaluation.
+    Returns (best parameters, their win rate) of the last generation.
+    """
+    rng = random.Random(f"evolve/{seed}")
+    population = [DEFAULT_PARAMETERS]
+    while len(population) < population_size:
+        population.append(mutate(DEFAULT_PARAMETERS, 3 * sigma, rng))
+    for generation in range(generations):
+        fitness = evaluate(
+            population,
+            opponents,
+            n_games,
+            f"{seed}/{generation}",
+            workers,
+            **game_kwargs,
+        )
+        if on_generation is not None:
+            on_generation(generation, population, fitness)
+        ranked = sorted(range(len(population)), key=lambda c: -fitness[c])
+        if generation == generations - 1:
+            return population[ranked[0]], fitness[ranked[0]]
+        parents = [population[c] for c in ranked[:elite]]
+        population = parents + [
+            mutate(rng.choice(parents), sigma, rng)
+            for i in range(population_size - elite)
+        ]
+
+
+def format_params(params):
+    return ", ".join(f"{name}={p:.2f}" for p, (name, *bounds) in zip(params, PARAMETERS))
+
+
+def main():
+    import time
+
+    start = time.perf_counter()
+
+    def report(generation, population, fitness):
+        best = max(range(len(population)), key=lambda c: fitness[c])
+        elapsed = time.perf_counter() - start
+        print(
+            f"generation {generation}: {fitness[best]:.1%} "
+            f"({format_params(population[best])}) after {elapsed:.0f}s"
+        )
+
+    params, fitness = evolve(on_generation=report)
+    print(f"best: {fitness:.1%} win rate with {format_params(params)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,259 @@
-from random import choice, getrandbits, shuffle
+from array import array
+from contextlib import contextmanager
+from itertools import combinations
+from typing import NamedTuple
 from uuid import uuid4
+import mmap
+import os
+import random
+import shutil
 
 
-def get_blocker(action, alive_players):
-    blocker = choose_player_excluding(alive_players, action.executing_player)
-    if blocker.controller.decide_block(action):
+class Decision(NamedTuple):
+    """
+    A decision a player has to take, i.e. a call of the controller method with the given name.
+    The rules are written as generators (steps) that yield Decisions and expect the answers to be sent back.
+    """
+
+    player: object
+    name: str
+    args: tuple
+
+    def ask(self):
+        return getattr(self.player.controller, self.name)(*self.args)
+
+
+def run_steps(steps):
+    """Runs a generator of rule steps, answering every Decision with the player's controller."""
+    try:
+        decision = next(steps)
+        while True:
+            decision = steps.send(decision.ask())
+    except StopIteration as stop:
+        return stop.value
+
+
+# options of a decision as (key, option) pairs, keys do not depend on a specific game
+def action_options(controller, action_types):
+    return [(a, a) for a in controller.get_available_actions(action_types)]
+
+
+def target_options(player, players):
+    return [(i, p) for i, p in enumerate(players) if p.is_alive() and p is not player]
+
+
+def yes_no_options():
+    return [(False, False), (True, True)]
+
+
+def reveal_options(influences):
+    options = {}
+    for character in influences:
+        options.setdefault(type(character), character)  # same type, same outcome
+    return list(options.items())
+
+
+def exchange_options(cards, n):
+    options = {}
+    for choice in combinations(cards, n):
+        key = tuple(sorted(type(c).__name__ for c in choice))
+        options.setdefault(key, list(choice))
+    return list(options.items())
+
+
+def decision_options(decision):
+    """Returns the distinct options of any Decision as (key, option) pairs."""
+    name, args = decision.name, decision.args
+    if name == "choose_action":
+        return action_options(decision.player.controller, *args)
+    elif name == "choose_target":
+        return target_options(decision.player, *args)
+    elif name == "choose_reveal":
+        return reveal_options(*args)
+    elif name == "choose_exchange":
+        return exchange_options(*args)
+    else:  # decide_challenge, decide_block, decide_challenge_block
+        return yes_no_options()
+
+
+class AlivePlayers:
+    """
+    Alive players of a game in seat order, re-indexed by the players whenever they die (or come back).
+    The positions are indexed, so that choosing a player excluding another one is O(1).
+    """
+
+    __slots__ = ("seats", "players", "positions")
+
+    def __init__(self, players):
+        self.seats = list(players)
+        self.index()
+
+    def index(self):
+        self.players = [p for p in self.seats if p.is_alive()]
+        self.positions = {p: i for i, p in enumerate(self.players)}
+
+    def update(self, player):
+        if player.is_alive() != (player in self.positions):  # O(n), but rare
+            self.index()
+
+    def __len__(self):
+        return len(self.players)
+
+    def __iter__(self):
+        return iter(self.players)
+
+    def __getitem__(self, i):
+        return self.players[i]
+
+    def excluding(self, excluded_player):
+        return get_relative_complement(self.players, excluded_player)
+
+    def choose_excluding(self, excluded_player, rng=random):
+        """Same draw as rng.choice(self.excluding(excluded_player)), without building the list."""
+        i = self.positions.get(excluded_player)
+        if i is None:
+            return rng.choice(self.players)
+        j = rng.randrange(len(self.players) - 1)
+        return self.players[j + (j >= i)]
+
+
+UNSEATED = AlivePlayers(())  # index of players that are not part of a game
+
+
+def get_blocker(action, alive_players, rng=random):
+    blocker = alive_players.choose_excluding(action.executing_player, rng)
+    if (yield Decision(blocker, "decide_block", (action,))):
         return blocker
     else:
         return None
 
 
-def get_block_challenger(action, alive_players):
-    block_challenger = choose_player_excluding(alive_players, action.blocking_player)
-    if block_challenger.controller.decide_challenge_block(action):
+def get_block_challenger(action, alive_players, rng=random):
+    block_challenger = alive_players.choose_excluding(action.blocking_player, rng)
+    if (yield Decision(block_challenger, "decide_challenge_block", (action,))):
         return block_challenger
     else:
         return None
 
 
-def get_challenger(action, alive_players):
-    challenger = choose_player_excluding(alive_players, action.executing_player)
-    if challenger.controller.decide_challenge(action):
+def get_challenger(action, alive_players, rng=random):
+    challenger = alive_players.choose_excluding(action.executing_player, rng)
+    if (yield Decision(challenger, "decide_challenge", (action,))):
         return challenger
     else:
         return None
 
 
-def choose_player_excluding(players, excluded_player):
-    options = get_relative_complement(players, excluded_player)
-    return choice(options)
+def get_relative_complement(complete_set, to_be_removed):
+    # keeps the original order, so seeded games are reproducible
+    return [e for e in complete_set if e is not to_be_removed]
 
 
-def get_relative_complement(complete_set, to_be_removed):
-    return list(set(complete_set) - {to_be_removed})
+@contextmanager
+def atomic_path(path):
+    """
+    Yields a temporary path next to path to write a file or a directory to.
+    Once the block succeeds, its contents are synced to disk and renamed to path, so readers
+    and crashes see either the old or the new version, never a partial one. On errors it is removed.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield temporary
+        files = [temporary]
+        if os.path.isdir(temporary):
+            files = [os.path.join(temporary, name) for name in os.listdir(temporary)]
+        for file in files:
+            with open(file, "rb") as f:
+                os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.isdir(temporary):
+            shutil.rmtree(temporary, ignore_errors=True)
+        elif os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def write_atomic(path, data):
+    """Writes bytes or text to path atomically, see atomic_path."""
+    with atomic_path(path) as temporary:
+        with open(temporary, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
 
 
 def generate_id():
     return str(uuid4())
 
 
-def coinflip():
-    return bool(getrandbits(1))
+def coinflip(rng=random):
+    return bool(rng.getrandbits(1))
+
+
+NAMES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "names.txt")
+
+
+class LineIndex:
+    """
+    Read-only, memory-mapped view on the lines of a text file.
+    The file is only mapped (and its table of line offsets built) on first access, so importing is free.
+    """
 
+    def __init__(self, path):
+        self.path = path
+        self.lines = None
+        self.offsets = None
 
-def read_names():
-    with open("names.txt") as f:
-        return f.read().splitlines()
+    def load(self):
+        with open(self.path, "rb") as f:
+            self.lines = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        offsets = array("L", [0])
+        position = self.lines.find(b"\n")
+        while position != -1:
+            offsets.append(position + 1)
+            position = self.lines.find(b"\n", position + 1)
+        if offsets[-1] != len(self.lines):  # last line without line break
+            offsets.append(len(self.lines) + 1)
+        self.offsets = offsets
+
+    def __len__(self):
+        if self.offsets is None:
+            self.load()
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if self.offsets is None:
+            self.load()
+        line = self.lines[self.offsets[i] : self.offsets[i + 1] - 1]
+        return line.decode().rstrip("\r")
 
 
 class RandomNameGenerator:
-    names = read_names()
-    shuffle(names)
+    """
+    Draws names without replacement from names.txt.
+    The draws are a lazy Fisher-Yates shuffle over the line index: every draw is O(1) and only the swapped positions are stored.
+    The state is shared by all instances, so no name is used twice.
+    """
+
+    names = LineIndex(NAMES_PATH)
+    swaps = {}
+    n_drawn = 0
+
+    def __init__(self, rng=None):
+        self.rng = rng or random
+
+    def draw_name(self):
+        cls = type(self)
+        i = cls.n_drawn
+        j = self.rng.randrange(i, len(self.names))  # raises ValueError if exhausted
+        name = self.swaps.get(j, j)
+        swapped = self.swaps.pop(i, i)
+        if j != i:
+            self.swaps[j] = swapped
+        cls.n_drawn += 1
+        return self.names[name]
 
     def get_random_name(self):
         try:
-            return f"{self.names.pop(0)} {self.names.pop(0)}"
-        except IndexError:
+            return f"{self.draw_name()} {self.draw_name()}"
+        except ValueError:
             return None
@@ -0,0 +1,289 @@
+"""
+Vectorized simulation of many games in lockstep with NumPy (optional dependency).
+
+Only controllers that decide without looking at the cards can be expressed as policy tables
+(see POLICIES). All games of a batch take their turns at the same time, the rules of actions.py
+are applied as masked array operations on:
+
+coins     (games, players)              coins of every player
+cards     (games, players, influences)  character index of every influence
+revealed  (games, players, influences)  whether the influence is revealed
+deck      (games, characters)           number of cards per character in the deck
+
+The deck is kept as counts only: since it is uniformly shuffled and put_back keeps it that way,
+drawing the top card is the same as drawing a card at random.
+"""
+from actions import Income, ForeignAid, Tax, Coup, Assassinate, Steal, Exchange
+from actions import BlockableAction, CharacterAction, InterAction
+from characters import Ambassador, Assassin, Captain, Contessa, Duke
+from entities import (
+    AIController_Random,
+    AIController_Defensive,
+    AIController_Offensive,
+    AIController_Gullible,
+    AIController_Skeptic,
+)
+from simulation import simulate
+from collections import Counter, namedtuple
+import numpy as np
+
+
+ACTIONS = [Income, ForeignAid, Tax, Coup, Assassinate, Steal, Exchange]
+CHARACTERS = [Ambassador, Assassin, Captain, Contessa, Duke]
+
+# rules of actions.py and characters.py as lookup tables
+COST = np.array([a.cost for a in ACTIONS])
+IS_INTER = np.array([issubclass(a, InterAction) for a in ACTIONS])
+IS_CHARACTER = np.array([issubclass(a, CharacterAction) for a in ACTIONS])
+IS_BLOCKABLE = np.array([issubclass(a, BlockableAction) for a in ACTIONS])
+CLAIMANTS = np.array([[a in c.actions for c in CHARACTERS] for a in ACTIONS])
+BLOCKERS = np.array([[a in c.blocks for c in CHARACTERS] for a in ACTIONS])
+GAIN = np.array([{Income: 1, ForeignAid: 2, Tax: 3}.get(a, 0) for a in ACTIONS])
+COUP, ASSASSINATE, STEAL, EXCHANGE = (
+    ACTIONS.index(a) for a in (Coup, Assassinate, Steal, Exchange)
+)
+
+
+PolicyTable = namedtuple(
+    "PolicyTable", ["action_weights", "challenge", "block", "challenge_block"]
+)
+PolicyTable.__doc__ = """
+Decisions of a controller as probabilities.
+action_weights: weight per action in ACTIONS, all available actions are chosen uniformly if no weighted one is available
+challenge, block: probability as (otherwise, if the action targets the deciding player)
+challenge_block: probability as (otherwise, if the blocked action is the deciding player's own)
+Targets, reveals and exchanges are always chosen uniformly at random.
+"""
+
+PEACEFUL = [0.0 if issubclass(a, InterAction) else 1.0 for a in ACTIONS]
+HOSTILE = [1.0 if issubclass(a, InterAction) else 0.0 for a in ACTIONS]
+ANY = [1.0] * len(ACTIONS)
+POLICIES = {
+    AIController_Random: PolicyTable(ANY, (0.5, 0.5), (0.5, 0.5), (0.5, 0.5)),
+    AIController_Defensive: PolicyTable(PEACEFUL, (0.0, 0.0), (0.0, 1.0), (0.0, 0.0)),
+    AIController_Offensive: PolicyTable(HOSTILE, (0.0, 1.0), (0.5, 0.5), (0.0, 1.0)),
+    AIController_Gullible: PolicyTable(ANY, (0.0, 0.0), (0.5, 0.5), (0.0, 0.0)),
+    AIController_Skeptic: PolicyTable(ANY, (1.0, 1.0), (0.5, 0.5), (1.0, 1.0)),
+}
+
+
+class Batch:
+    """State of n_games games with the same line-up of controllers, one per seat."""
+
+    def __init__(
+        self,
+        controllers,
+        n_games,
+        n_influences=2,
+        starting_coins=2,
+        multiplicity=3,
+        rng=None,
+    ):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        tables = [POLICIES[c] for c in controllers]
+        self.action_weights = np.array([t.action_weights for t in tables])
+        self.p_challenge = np.array([t.challenge for t in tables])
+        self.p_block = np.array([t.block for t in tables])
+        self.p_challenge_block = np.array([t.challenge_block for t in tables])
+        n_players = len(controllers)
+        self.seats = np.arange(n_players)
+        self.deck = np.full((n_games, len(CHARACTERS)), multiplicity)
+        self.cards = np.empty((n_games, n_players, n_influences), dtype=np.int8)
+        everyone = np.arange(n_games)
+        for p in range(n_players):
+            for i in range(n_influences):
+                self.cards[:, p, i] = self.draw(everyone)
+        self.revealed = np.zeros((n_games, n_players, n_influences), dtype=bool)
+        self.coins = np.full((n_games, n_players), starting_coins)
+        self.seat = np.zeros(n_games, dtype=int)
+        self.rounds = np.zeros(n_games, dtype=int)
+        self.winner = np.full(n_games, -1)
+
+    # random helpers, g are arrays of game indices
+    def choose(self, mask):
+        """Index of a uniformly chosen True entry per row."""
+        return np.where(mask, self.rng.random(mask.shape), -1.0).argmax(axis=1)
+
+    def categorical(self, weights):
+        cumulative = weights.cumsum(axis=1)
+        u = self.rng.random(len(weights)) * cumulative[:, -1]
+        return (u[:, None] < cumulative).argmax(axis=1)
+
+    def coinflips(self, p):
+        return self.rng.random(len(p)) < p
+
+    def alive(self, g):
+        return ~self.revealed[g].all(axis=2)
+
+    def choose_other(self, g, excluded):
+        """Uniformly chosen alive player per game, other than excluded."""
+        return self.choose(self.alive(g) & (self.seats != excluded[:, None]))
+
+    # rules
+    def draw(self, g):
+        character = self.categorical(self.deck[g])
+        self.deck[g, character] -= 1
+        return character
+
+    def replace(self, g, p, slot):
+        """Puts a proven card back into the deck and draws a new one."""
+        self.deck[g, self.cards[g, p, slot]] += 1
+        self.cards[g, p, slot] = self.draw(g)
+
+    def lose_influence(self, g, p):
+        slot = self.choose(~self.revealed[g, p])
+        self.revealed[g, p, slot] = True
+
+    def proof(self, g, p, table, action):
+        """Returns whether the player can prove the claim, and the slot of the first fitting card."""
+        fits = table[action[:, None], self.cards[g, p]] & ~self.revealed[g, p]
+        return fits.any(axis=1), fits.argmax(axis=1)
+
+    def exchange(self, g, p):
+        unrevealed = ~self.revealed[g, p]
+        n_kept = unrevealed.sum(axis=1)
+        drawn = np.stack([self.draw(g), self.draw(g)], axis=1)
+        pool = np.concatenate([self.cards[g, p], drawn], axis=1)
+        valid = np.concatenate([unrevealed, np.ones_like(drawn, dtype=bool)], axis=1)
+        keys = np.where(valid, self.rng.random(pool.shape), np.inf)
+        shuffled = np.take_along_axis(pool, keys.argsort(axis=1), axis=1)
+        # the first n_kept cards of the random order are kept, the next two go back
+        rank = unrevealed.cumsum(axis=1) - 1
+        kept = np.take_along_axis(shuffled, np.maximum(rank, 0), axis=1)
+        self.cards[g, p] = np.where(unrevealed, kept, self.cards[g, p])
+        for i in range(2):
+            back = np.take_along_axis(shuffled, (n_kept + i)[:, None], axis=1)[:, 0]
+            np.add.at(self.deck, (g, back), 1)
+
+    def end_finished(self, g):
+        """Marks games with a single player left as over, returns the games still running."""
+        alive = self.alive(g)
+        over = alive.sum(axis=1) == 1
+        self.winner[g[over]] = alive[over].argmax(axis=1)
+        return g[~over]
+
+    def run(self, max_turns=100000):
+        running = np.arange(len(self.seat))
+        for turn in range(max_turns):
+            if len(running) == 0:
+                break
+            self.play_turn(running)
+            running = self.end_finished(running)
+            self.next_seat(running)
+        return self.winner
+
+    def next_seat(self, g):
+        current = self.seat[g]
+        n_players = len(self.seats)
+        order = (current[:, None] + np.arange(1, n_players + 1)) % n_players
+        alive = np.take_along_axis(self.alive(g), order, axis=1)
+        following = order[np.arange(len(g)), alive.argmax(axis=1)]
+        self.rounds[g] += following <= current
+        self.seat[g] = following
+
+    def play_turn(self, g):
+        a = self.seat[g]
+        # declare
+        coins = self.coins[g, a]
+        available = COST[None, :] <= coins[:, None]
+        available[coins >= 10] = np.arange(len(ACTIONS)) == COUP
+        weights = self.action_weights[a] * available
+        unweighted = weights.sum(axis=1) == 0
+        weights[unweighted] = available[unweighted]
+        action = self.categorical(weights)
+        target = self.choose_other(g, a)
+        self.coins[g, a] -= COST[action]
+        inter = IS_INTER[action]
+        going = np.ones(len(g), dtype=bool)  # action not stopped yet
+
+        # challenge
+        rows = np.flatnonzero(IS_CHARACTER[action])
+        asked = self.choose_other(g[rows], a[rows])
+        targeted = (inter[rows] & (target[rows] == asked)).astype(int)
+        challenged = self.coinflips(self.p_challenge[asked, targeted])
+        rows, challenger = rows[challenged], asked[challenged]
+        proven, slot = self.proof(g[rows], a[rows], CLAIMANTS, action[rows])
+        r = rows[proven]
+        self.replace(g[r], a[r], slot[proven])
+        self.lose_influence(g[r], challenger[proven])
+        r = rows[~proven]
+        self.lose_influence(g[r], a[r])
+        going[r] = False
+        going &= self.alive(g).sum(axis=1) > 1  # the game might be over already
+
+        # block
+        rows = np.flatnonzero(going & IS_BLOCKABLE[action])
+        asked = self.choose_other(g[rows], a[rows])
+        targeted = (inter[rows] & (target[rows] == asked)).astype(int)
+        blocked = self.coinflips(self.p_block[asked, targeted])
+        rows, blocker = rows[blocked], asked[blocked]
+        going[rows] = False
+        asked = self.choose_other(g[rows], blocker)
+        own = (asked == a[rows]).astype(int)
+        challenged = self.coinflips(self.p_challenge_block[asked, own])
+        rows, blocker = rows[challenged], blocker[challenged]
+        challenger = asked[challenged]
+        proven, slot = self.proof(g[rows], blocker, BLOCKERS, action[rows])
+        self.replace(g[rows[proven]], blocker[proven], slot[proven])
+        self.lose_influence(g[rows[proven]], challenger[proven])
+        self.lose_influence(g[rows[~proven]], blocker[~proven])
+        going[rows[~proven]] = True  # block was a bluff
+
+        # execute
+        rows = np.flatnonzero(going)
+        gr, ar, act, tr = g[rows], a[rows], action[rows], target[rows]
+        self.coins[gr, ar] += GAIN[act]
+        target_alive = self.alive(gr)[np.arange(len(gr)), tr]
+        kill = (act == COUP) | ((act == ASSASSINATE) & target_alive)
+        self.lose_influence(gr[kill], tr[kill])
+        steal = act == STEAL
+        stolen = np.minimum(self.coins[gr[steal], tr[steal]], 2)
+        self.coins[gr[steal], tr[steal]] -= stolen
+        self.coins[gr[steal], ar[steal]] += stolen
+        swap = act == EXCHANGE
+        self.exchange(gr[swap], ar[swap])
+
+
+def simulate_batch(controllers, n_games, seed=None, **kwargs):
+    """
+    Plays n_games games of the controller classes (one per seat) in lockstep.
+    Returns the seat index of every game's winner.
+    """
+    rng = np.random.default_rng(seed)
+    return Batch(controllers, n_games, rng=rng, **kwargs).run()
+
+
+def cross_check(controllers, n_games=20000, seed=0):
+    """
+    Compares the distribution of winning seats of the vectorized and the object based engine.
+    Returns both distributions and Pearson's chi-squared statistic of their difference,
+    which should not be much larger than the degrees of freedom (players - 1) for matching engines.
+    """
+    vectorized = Counter(simulate_batch(controllers, n_games, seed).tolist())
+    objects = Counter(r.winner for r in simulate(n_games, controllers, seed=seed))
+    chi2 = 0.0
+    for seat in range(len(controllers)):
+        expected = (vectorized[seat] + objects[seat]) / 2
+        if expected > 0:
+            chi2 += 2 * (vectorized[seat] - expected) ** 2 / expected
+    vectorized = [vectorized[s] / n_games for s in range(len(controllers))]
+    objects = [objects[s] / n_games for s in range(len(controllers))]
+    return vectorized, objects, chi2
+
+
+def main(n_games=100000, seed=0):
+    import time
+
+    controllers = list(POLICIES)
+    start = time.perf_counter()
+    winners = simulate_batch(controllers, n_games, seed)
+    elapsed = time.perf_counter() - start
+    print(f"{n_games} games in {elapsed:.1f}s ({n_games / elapsed:.0f} games/s)")
+    for seat, wins in enumerate(np.bincount(winners, minlength=len(controllers))):
+        print(f"{controllers[seat].__name__}: {wins / n_games:.3f}")
+    vectorized, objects, chi2 = cross_check(controllers, 10000, seed)
+    print(f"cross-check against Game: chi2 = {chi2:.1f} ({len(controllers) - 1} dof)")
+
+
+if __name__ == "__main__":
+    main()